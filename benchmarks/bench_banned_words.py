@@ -0,0 +1,159 @@
+"""
+Benchmarks the banned word filter against the per-word implementation it replaced
+
+Both filters run over synthetic lyrics built from common words with a
+share of banned words mixed in. Results are written as JSON, including
+how many texts both implementations censor identically.
+
+Usage:
+------
+`python benchmarks/bench_banned_words.py`
+`python benchmarks/bench_banned_words.py --lines 5 --iterations 2000`
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ext.helpers import BannedWordMatcher  # noqa: E402
+
+
+WORD_FILE = os.path.join(ROOT, "storage", "banned_word.txt")
+RESULTS = os.path.join(ROOT, "benchmarks", "results")
+
+
+WORDS = (
+    "the love night baby heart dance never gonna give you up let down run around "
+    "and desert i just want to tell how feeling got make understand we know game "
+    "rules so do what it takes all over again tonight fire rain dream city lights"
+).split()
+
+
+def legacy_filter_banned_words(text: str) -> str:
+    # The implementation before the compiled matcher, kept for comparison
+    with open(WORD_FILE) as f:
+        words = f.read().split(", ")
+
+    new_text = text
+    for word in words:
+        pattern = re.compile(re.escape(word), re.IGNORECASE)
+
+        def censor(match):
+            matched_word = match.group()
+            word_length = len(matched_word) // 2
+            stars = r"\*" * word_length
+            return f"{stars}{matched_word[word_length:]}"
+
+        new_text = pattern.sub(censor, new_text)
+
+    return new_text
+
+
+def make_texts(count: int, lines: int, ratio: float, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    with open(WORD_FILE) as f:
+        banned = [word.strip() for word in f.read().split(",") if word.strip()]
+    texts = []
+    for _ in range(count):
+        text = []
+        for _ in range(lines):
+            line = [
+                rng.choice(banned) if rng.random() < ratio else rng.choice(WORDS)
+                for _ in range(rng.randrange(6, 12))
+            ]
+            text.append(" ".join(line).capitalize())
+        texts.append("\n".join(text))
+    return texts
+
+
+def measure(
+    censor: Callable[[str], str], texts: List[str], iterations: int
+) -> Dict[str, float]:
+    samples = []
+    for iteration in range(iterations):
+        text = texts[iteration % len(texts)]
+        started = time.perf_counter()
+        censor(text)
+        samples.append(time.perf_counter() - started)
+    ordered = sorted(samples)
+    return {
+        "iterations": iterations,
+        "mean_us": statistics.fmean(samples) * 1e6,
+        "p50_us": ordered[len(ordered) // 2] * 1e6,
+        "p95_us": ordered[int(len(ordered) * 0.95)] * 1e6,
+        "max_us": ordered[-1] * 1e6,
+        "calls_per_second": iterations / sum(samples),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--texts", type=int, default=200, help="distinct texts")
+    parser.add_argument("--lines", type=int, default=5, help="lines per text")
+    parser.add_argument(
+        "--ratio", type=float, default=0.05, help="share of banned words"
+    )
+    parser.add_argument("--iterations", type=int, default=1000, help="timed calls")
+    parser.add_argument("--seed", type=int, default=6, help="random seed")
+    parser.add_argument(
+        "--output",
+        default=os.path.join(RESULTS, "bench_banned_words.json"),
+        help="where to write the JSON",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    texts = make_texts(args.texts, args.lines, args.ratio, args.seed)
+    matcher = BannedWordMatcher(WORD_FILE)
+
+    results = {
+        "legacy": measure(legacy_filter_banned_words, texts, args.iterations),
+        "matcher": measure(matcher.censor, texts, args.iterations),
+    }
+    results["speedup"] = results["legacy"]["mean_us"] / results["matcher"]["mean_us"]
+    identical = sum(
+        legacy_filter_banned_words(text) == matcher.censor(text) for text in texts
+    )
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "texts": args.texts,
+            "lines": args.lines,
+            "ratio": args.ratio,
+            "seed": args.seed,
+            "identical_output": identical / len(texts),
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=4)
+    for name in ("legacy", "matcher"):
+        result = results[name]
+        print(
+            f"{name:<8} mean {result['mean_us']:9.1f}us  p95 {result['p95_us']:9.1f}us"
+        )
+    print(
+        f"speedup  {results['speedup']:.1f}x, "
+        f"identical output {identical}/{len(texts)}"
+    )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""
+Benchmarks the Database helpers on synthetic community data
+
+Fills temporary copies of the six databases and times the hot operations
+of the bot through the real `Database` helpers. Results are written as JSON
+so runs can be compared across changes.
+
+Usage:
+------
+`python benchmarks/bench_database.py`
+`python benchmarks/bench_database.py --scale 0.1 --iterations 50`
+`python benchmarks/bench_database.py --output results.json --keep`
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import string
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ext.consts import TCR_GUILD_ID, WARNING_EXPIRY  # noqa: E402
+from ext.models import Database  # noqa: E402
+
+
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+DAY = 60 * 60 * 24
+
+# Row counts at --scale 1
+VOLUMES = {
+    "message_metric": 1_000_000,
+    "thanks_data": 200_000,
+    "thanks_info": 20_000,
+    "warnings": 50_000,
+    "help_warns": 10_000,
+    "tickets": 20_000,
+}
+
+# Guilds message_metric rows are spread over, the bot lives in a few
+GUILDS = (TCR_GUILD_ID, 1, 2, 3)
+
+INSERT_BATCH = 50_000
+
+
+def snowflake(rng: random.Random) -> int:
+    return rng.randrange(10**17, 10**18)
+
+
+def batched(rows: Any, size: int = INSERT_BATCH):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Fixture:
+    """
+    The synthetic data set, kept around so the benchmarks can pick
+    existing users, moderators and ticket openers
+    """
+
+    def __init__(self, scale: float, seed: int) -> None:
+        self.rng = random.Random(seed)
+        self.now = int(time.time())
+        self.volumes = {
+            table: max(int(rows * scale), 1) for table, rows in VOLUMES.items()
+        }
+        members = max(self.volumes["message_metric"] // len(GUILDS), 1)
+        self.members = [snowflake(self.rng) for _ in range(members)]
+        self.thanked = self.members[: self.volumes["thanks_info"]]
+        self.warned = self.members[: max(self.volumes["warnings"] // 5, 1)]
+        self.openers = self.members[: max(self.volumes["tickets"] // 2, 1)]
+
+    def date(self, days: int) -> int:
+        return self.now - self.rng.randrange(days * DAY)
+
+    def metrics(self):
+        for user_id in self.members:
+            for guild_id in GUILDS:
+                statuses = [self.rng.randrange(200) for _ in range(4)]
+                yield (
+                    user_id,
+                    guild_id,
+                    sum(statuses),
+                    self.rng.randrange(20),
+                    *statuses,
+                    int(self.rng.random() < 0.01),
+                )
+
+    def thanks_data(self):
+        characters = string.ascii_letters + string.digits
+        for _ in range(self.volumes["thanks_data"]):
+            yield (
+                self.rng.choice(self.thanked),
+                self.rng.choice(self.members),
+                TCR_GUILD_ID,
+                snowflake(self.rng),
+                snowflake(self.rng),
+                "".join(self.rng.choice(characters) for _ in range(7)),
+                self.date(365),
+                "Synthetic thanks",
+                int(self.rng.random() < 0.05),
+                int(self.rng.random() < 0.02),
+            )
+
+    def thanks_info(self):
+        for user_id in self.thanked:
+            yield user_id, TCR_GUILD_ID, int(self.rng.paretovariate(1.2))
+
+    def warnings(self, table: str):
+        for _ in range(self.volumes[table]):
+            yield (
+                self.rng.choice(self.warned),
+                TCR_GUILD_ID,
+                snowflake(self.rng),
+                "Synthetic warning",
+                self.date(120),
+            )
+
+    def tickets(self):
+        for ticket_id in range(self.volumes["tickets"]):
+            opened_at = self.date(365)
+            yield (
+                snowflake(self.rng),
+                ticket_id,
+                self.rng.choice(self.openers),
+                snowflake(self.rng),
+                opened_at,
+                opened_at + self.rng.randrange(DAY),
+                "Synthetic ticket",
+            )
+
+
+async def populate(db: Database, fixture: Fixture) -> Dict[str, float]:
+    tables = (
+        (
+            "metrics",
+            "INSERT OR IGNORE INTO message_metric VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            fixture.metrics(),
+        ),
+        (
+            "thanks",
+            "INSERT INTO thanks_data VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            fixture.thanks_data(),
+        ),
+        (
+            "thanks",
+            "INSERT OR IGNORE INTO thanks_info VALUES (?, ?, ?)",
+            fixture.thanks_info(),
+        ),
+        (
+            "warnings",
+            "INSERT INTO warnings VALUES (?, ?, ?, ?, ?)",
+            fixture.warnings("warnings"),
+        ),
+        (
+            "warnings",
+            "INSERT INTO help_warns VALUES (?, ?, ?, ?, ?)",
+            fixture.warnings("help_warns"),
+        ),
+        (
+            "tickets",
+            "INSERT INTO tickets VALUES (?, ?, ?, ?, ?, ?, ?)",
+            fixture.tickets(),
+        ),
+    )
+    timings = {}
+    for connection, sql, rows in tables:
+        table = sql.split("INTO ")[1].split()[0]
+        started = time.perf_counter()
+        async with db.transaction(connection) as conn:
+            for batch in batched(rows):
+                await conn.executemany(sql, batch)
+        timings[table] = time.perf_counter() - started
+    for name in ("metrics", "thanks", "warnings", "tickets"):
+        async with db.transaction(name) as conn:
+            await conn.execute("ANALYZE")
+    return timings
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+
+    def percentile(fraction: float) -> float:
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+    return {
+        "iterations": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "min_ms": ordered[0] * 1000,
+        "p50_ms": percentile(0.5) * 1000,
+        "p95_ms": percentile(0.95) * 1000,
+        "p99_ms": percentile(0.99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+        "ops_per_second": len(samples) / sum(samples) if sum(samples) else 0.0,
+    }
+
+
+async def measure(
+    operation: Callable[[int], Awaitable[Any]], iterations: int, warmup: int = 3
+) -> Dict[str, float]:
+    for iteration in range(warmup):
+        await operation(iteration)
+    samples = []
+    for iteration in range(warmup, warmup + iterations):
+        started = time.perf_counter()
+        await operation(iteration)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+async def run(args: argparse.Namespace, directory: str) -> Dict[str, Any]:
+    logger = logging.getLogger("benchmark")
+    bot = SimpleNamespace(logger=logger)
+    fixture = Fixture(args.scale, args.seed)
+    rng = random.Random(args.seed + 1)
+    results: Dict[str, Any] = {}
+
+    async with Database(bot, path=directory) as db:
+        # Slow query logging would dominate the timings at this volume
+        db.monitor.threshold = float("inf")
+        # Flushes are timed explicitly, not by the loop or the row limit
+        db.aggregator.flush_loop.cancel()
+        db.aggregator.max_rows = sys.maxsize
+
+        logger.info("Populating %s", fixture.volumes)
+        load = await populate(db, fixture)
+
+        async def metric_upsert(_: int) -> None:
+            for _ in range(args.batch):
+                await db.aggregator.record_message(
+                    rng.choice(fixture.members),
+                    rng.choice(GUILDS),
+                    status=rng.choice(("online", "offline", "dnd", "idle")),
+                    is_staff=False,
+                )
+            await db.aggregator.flush()
+
+        async def warnings_list(_: int) -> None:
+            await db.select_record(
+                "warnings",
+                arguments=("reason", "moderator_id", "date"),
+                table="warnings",
+                where=("guild_id", "user_id"),
+                values=(TCR_GUILD_ID, rng.choice(fixture.warned)),
+                extras=["ORDER BY date DESC"],
+            )
+
+        async def thank_leaderboard(_: int) -> None:
+            await db.select_record(
+                "thanks",
+                table="thanks_info",
+                arguments=("user_id", "thanks_count"),
+                where=["guild_id"],
+                values=[TCR_GUILD_ID],
+                extras=["ORDER BY thanks_count DESC, user_id ASC LIMIT 100"],
+            )
+
+        async def ticket_lookup(_: int) -> None:
+            await db.select_record(
+                "tickets",
+                arguments=("ticket_id", "message_id", "reason"),
+                table="tickets",
+                where=("opened_by",),
+                values=(rng.choice(fixture.openers),),
+            )
+
+        # Every run moves the cutoff a day forward so each one deletes rows
+        oldest = fixture.now - 120 * DAY
+
+        async def warning_expiry(iteration: int) -> None:
+            cutoff = min(oldest + (iteration + 1) * DAY, fixture.now - WARNING_EXPIRY)
+            async with db.transaction("warnings"):
+                for table in ("warnings", "help_warns"):
+                    await db.delete_record(
+                        "warnings",
+                        table=table,
+                        where=("guild_id", "date < ?"),
+                        values=(TCR_GUILD_ID, cutoff),
+                    )
+
+        operations = {
+            "metric_upsert": metric_upsert,
+            "warnings_list": warnings_list,
+            "thank_leaderboard": thank_leaderboard,
+            "ticket_lookup": ticket_lookup,
+            "warning_expiry": warning_expiry,
+        }
+        for name, operation in operations.items():
+            if args.only and name not in args.only:
+                continue
+            logger.info("Running %s", name)
+            results[name] = await measure(operation, args.iterations)
+        if "metric_upsert" in results:
+            results["metric_upsert"]["rows_per_flush"] = args.batch
+
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "scale": args.scale,
+            "seed": args.seed,
+            "iterations": args.iterations,
+            "rows": fixture.volumes,
+            "load_seconds": load,
+        },
+        "results": results,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="multiplier for the row counts"
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=200, help="timed runs per operation"
+    )
+    parser.add_argument(
+        "--batch", type=int, default=500, help="rows per metric upsert flush"
+    )
+    parser.add_argument("--seed", type=int, default=6, help="random seed")
+    parser.add_argument(
+        "--only", nargs="*", help="operations to run, all of them by default"
+    )
+    parser.add_argument(
+        "--output",
+        default=os.path.join(RESULTS, "bench_database.json"),
+        help="where to write the JSON",
+    )
+    parser.add_argument(
+        "--keep", action="store_true", help="keep the generated databases"
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    directory = tempfile.mkdtemp(prefix="coding-bot-bench-")
+    try:
+        report = asyncio.run(run(args, directory))
+    finally:
+        if args.keep:
+            logging.info("Databases kept in %s", directory)
+        else:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=4)
+    for name, result in report["results"].items():
+        print(
+            f"{name:<20} p50 {result['p50_ms']:8.3f}ms  p95 {result['p95_ms']:8.3f}ms"
+            f"  {result['ops_per_second']:10.1f} ops/s"
+        )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -235,6 +235,7 @@ class Developer(commands.Cog, command_attrs=dict(hidden=True)):
         revoked_thank_count = revoked_thank_count[0].count
         surviving_thank_count = total_thank_count - revoked_thank_count
 
+        await self.bot.conn.aggregator.flush()
         message_metric = await self.bot.conn.select_record(
             "metrics",
             table="message_metric",
@@ -308,6 +309,208 @@ class Developer(commands.Cog, command_attrs=dict(hidden=True)):
         )
         await ctx.send(embed=embed)
 
+    @commands.group(name="stats", invoke_without_command=True, hidden=True)
+    @commands.is_owner()
+    async def _stats(self, ctx: commands.Context[CodingBot]):
+        """
+        Show runtime statistics of the bot
+
+        Usage:
+        ------
+        `{prefix}stats db [limit]`
+        `{prefix}stats dispatch`
+        `{prefix}stats budget`
+        `{prefix}stats http`
+        `{prefix}stats breakers`
+        """
+        await ctx.send_help(ctx.command)
+
+    @_stats.command(name="db")
+    @commands.is_owner()
+    async def _stats_db(self, ctx: commands.Context[CodingBot], limit: int = 10):
+        """
+        Show the statements that took the most time in total,
+        the wait for a connection and the statement cache hit rate
+
+        Usage:
+        ------
+        `{prefix}stats db [limit]`
+        """
+        monitor = self.bot.conn.monitor
+        lines = []
+        for index, stats in enumerate(monitor.top(limit), start=1):
+            latency = stats.latency
+            sql = " ".join(stats.sql.split())
+            lines.append(
+                f"{index}. [{stats.connection}] {sql[:120]}\n"
+                f"   calls {latency.count} total {latency.total * 1000:.1f}ms "
+                f"mean {latency.mean * 1000:.2f}ms max {latency.maximum * 1000:.1f}ms "
+                f"rows {stats.rows}\n"
+                f"   {latency.format()}"
+            )
+        description = "\n".join(lines) or "No statements recorded yet"
+        embed = discord.Embed(
+            title="Database statistics",
+            description=f"```\n{description[:4000]}\n```",
+            color=discord.Color.blurple(),
+            timestamp=discord.utils.utcnow(),
+        )
+        embed.add_field(
+            name="Connection wait",
+            value="\n".join(
+                f"`{name}`: {wait.count} waits, mean {wait.mean * 1000:.2f}ms, "
+                f"max {wait.maximum * 1000:.1f}ms"
+                for name, wait in monitor.waits.items()
+            )
+            or "None",
+            inline=False,
+        )
+        embed.add_field(
+            name="Statement cache",
+            value="\n".join(
+                f"`{name}`: {info.hits} hits, {info.misses} misses, "
+                f"{info.currsize}/{info.maxsize} cached"
+                for name, info in self.bot.conn.statement_cache_info().items()
+            ),
+            inline=False,
+        )
+        embed.set_footer(
+            text=f"Slow query threshold: {monitor.threshold * 1000:g}ms",
+        )
+        await ctx.send(embed=embed)
+
+    @_stats.command(name="dispatch")
+    @commands.is_owner()
+    async def _stats_dispatch(self, ctx: commands.Context[CodingBot]):
+        """
+        Show how often every message handler ran and how long it took
+
+        Usage:
+        ------
+        `{prefix}stats dispatch`
+        """
+        lines = []
+        for handler in self.bot.dispatcher.handlers.values():
+            latency = handler.latency
+            lines.append(
+                f"{handler.name}\n"
+                f"   runs {latency.count} errors {handler.errors} "
+                f"mean {latency.mean * 1000:.2f}ms max {latency.maximum * 1000:.1f}ms"
+            )
+        description = "\n".join(lines) or "No message handlers registered"
+        embed = discord.Embed(
+            title="Message dispatcher statistics",
+            description=f"```\n{description[:4000]}\n```",
+            color=discord.Color.blurple(),
+            timestamp=discord.utils.utcnow(),
+        )
+        flood = self.bot.dispatcher.flood
+        embed.set_footer(
+            text=f"Floods detected: {flood.trips} "
+            f"(limit {flood.max_messages} messages or {flood.max_duplicates} "
+            f"duplicates per {flood.per:g}s)",
+        )
+        await ctx.send(embed=embed)
+
+    @_stats.command(name="budget")
+    @commands.is_owner()
+    async def _stats_budget(self, ctx: commands.Context[CodingBot]):
+        """
+        Show how many automatic reactions and replies were sent and dropped
+
+        Usage:
+        ------
+        `{prefix}stats budget`
+        """
+        budget = self.bot.budget
+        lines = [
+            f"{feature}\n"
+            f"   sent {budget.allowed[feature]} dropped {budget.dropped[feature]} "
+            f"limit {capacity} per {per:g}s per channel"
+            for feature, (capacity, per) in budget.budgets.items()
+        ]
+        embed = discord.Embed(
+            title="Outbound budget statistics",
+            description="```\n{}\n```".format("\n".join(lines)),
+            color=discord.Color.blurple(),
+            timestamp=discord.utils.utcnow(),
+        )
+        embed.set_footer(
+            text=f"Shared limit: {budget.shared.capacity} per {budget.shared.per:g}s",
+        )
+        await ctx.send(embed=embed)
+
+    @_stats.command(name="http")
+    @commands.is_owner()
+    async def _stats_http(self, ctx: commands.Context[CodingBot]):
+        """
+        Show how many HTTP requests the cache and request coalescing saved
+
+        Usage:
+        ------
+        `{prefix}stats http`
+        """
+        cache = self.bot.http_client.cache
+        flights = self.bot.http_client.flights
+        embed = discord.Embed(
+            title="HTTP cache statistics",
+            description=(
+                f"Hit ratio: {cache.hit_ratio:.1%}\n"
+                f"Hits: {cache.hits}\n"
+                f"Revalidated: {cache.revalidated}\n"
+                f"Misses: {cache.misses}\n"
+                f"Responses cached: {len(cache)} "
+                f"({cache.size / 1024:.1f}/{cache.max_bytes / 1024:.0f} KiB)"
+            ),
+            color=discord.Color.blurple(),
+            timestamp=discord.utils.utcnow(),
+        )
+        embed.add_field(
+            name="Coalescing",
+            value=f"Requests sent: {flights.calls}\n"
+            f"Requests saved: {flights.shared}\n"
+            f"In flight: {len(flights)}",
+            inline=False,
+        )
+        await ctx.send(embed=embed)
+
+    @_stats.command(name="breakers")
+    @commands.is_owner()
+    async def _stats_breakers(self, ctx: commands.Context[CodingBot]):
+        """
+        Show the circuit breaker of every upstream host and the retry budget
+
+        Usage:
+        ------
+        `{prefix}stats breakers`
+        """
+        http = self.bot.http_client
+        lines = []
+        for breaker in sorted(
+            http.breakers.values(), key=lambda breaker: breaker.state == "closed"
+        ):
+            line = (
+                f"{breaker.host}: {breaker.state}\n"
+                f"   failures {breaker.failures} trips {breaker.trips} "
+                f"rejected {breaker.rejected}"
+            )
+            if breaker.state == breaker.OPEN:
+                line += f" probe in {breaker.retry_after:.0f}s"
+            lines.append(line)
+        description = "\n".join(lines) or "No requests made yet"
+        embed = discord.Embed(
+            title="Circuit breakers",
+            description=f"```\n{description[:4000]}\n```",
+            color=discord.Color.blurple(),
+            timestamp=discord.utils.utcnow(),
+        )
+        budget = http.retry_budget
+        embed.set_footer(
+            text=f"Retry budget: {budget.tokens:.1f}/{budget.reserve:g} left, "
+            f"{budget.retries} retries, {budget.denied} denied",
+        )
+        await ctx.send(embed=embed)
+
 
 async def setup(bot: CodingBot):
     await bot.add_cog(Developer(bot))
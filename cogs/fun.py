@@ -9,7 +9,6 @@ import base64
 import discord
 from discord.ext import commands
 from ext.helpers import create_trash_meme, invert_string
-from ext.http import Http
 
 import asyncio
 
@@ -21,7 +20,7 @@ class Fun(commands.Cog, command_attrs=dict(hidden=False)):
     hidden = False
 
     def __init__(self, bot: CodingBot) -> None:
-        self.http = Http(bot.session)
+        self.http = bot.http_client
         self.bot = bot
 
     @commands.command(name="trash")
@@ -68,7 +67,7 @@ class Fun(commands.Cog, command_attrs=dict(hidden=False)):
 
     @commands.hybrid_command(name="meme")
     async def meme(self, ctx: commands.Context[CodingBot]):
-        meme_json = await self.http.api["get"]["meme"]()
+        meme_json = await self.http.prefetch["meme"].get()
 
         meme_url = meme_json["url"]
         meme_name = meme_json["title"]
@@ -96,7 +95,7 @@ class Fun(commands.Cog, command_attrs=dict(hidden=False)):
         ------
         `{prefix}joke`: *will get a random joke*
         """
-        joke_json = await self.http.api["joke"]["api"]()
+        joke_json = await self.http.prefetch["joke"].get()
         category = joke_json["category"]
         setup, delivery = None, None
         if joke_json["type"] == "single":
@@ -19,7 +19,7 @@ class General(commands.Cog, command_attrs=dict(hidden=False)):
 
     def __init__(self, bot: CodingBot) -> None:
         self.bot = bot
-        self.ud = UrbanDictionary(bot.session)
+        self.ud = UrbanDictionary(bot.http_client)
 
     @commands.hybrid_command(name="source", aliases=["github", "code"])
     @commands.cooldown(1, 1, commands.BucketType.channel)
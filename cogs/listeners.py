@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import re
 import sys
 import time as unitime
 import asyncio
@@ -12,14 +11,17 @@ from typing import TYPE_CHECKING
 import discord
 from datetime import timezone
 from discord.ext import commands
-from ext.consts import TCR_STAFF_ROLE_ID
-from ext.helpers import check_invite
-from ext.errors import InsufficientPrivilegeError
+from ext.dispatch import MessageView, message_handler
+from ext.helpers import check_invite, find_invite_codes
+from ext.errors import CircuitOpenError, InsufficientPrivilegeError
 
 if TYPE_CHECKING:
     from ext.models import CodingBot
 
 
+CAT_WORDS = frozenset({"cat", "placeholder"})
+
+
 class ListenerCog(commands.Cog, command_attrs=dict(hidden=True)):
     hidden = True
 
@@ -37,6 +39,12 @@ class ListenerCog(commands.Cog, command_attrs=dict(hidden=True)):
 
         self.valid_gh_sect = valid_gh_sect
 
+    async def cog_load(self) -> None:
+        self.bot.dispatcher.add_cog(self)
+
+    async def cog_unload(self) -> None:
+        self.bot.dispatcher.remove_cog(self)
+
     # @commands.Cog.listener("on_message")
     # async def thank_message(self, message: discord.Message):
     #     """
@@ -63,16 +71,24 @@ class ListenerCog(commands.Cog, command_attrs=dict(hidden=True)):
     #             "you can thank them by using the `.thank` command."
     #         )
 
-    @commands.Cog.listener("on_message")
-    async def check_cat_message(self, message: discord.Message):
+    @message_handler(
+        when=lambda self, view: not view.tokens.isdisjoint(CAT_WORDS),
+        guild_only=False,
+        ignore_bots=False,
+    )
+    async def check_cat_message(self, view: MessageView):
         """
         Checks if a message has 'cat' or 'placeholder' in it and reacts with '<a:placeholder:1277351370751737998>'
         """
-        if 'cat' in message.content.lower().split() or 'placeholder' in message.content.lower().split():
-            await message.add_reaction('<a:placeholder:1277351370751737998>')
+        if not self.bot.budget.allow("cat_reaction", view.channel.id):
+            return
+        await view.message.add_reaction('<a:placeholder:1277351370751737998>')
 
-    @commands.Cog.listener("on_message")
-    async def afk_user_messaage(self, message: discord.Message):
+    @message_handler(
+        when=lambda self, view: self.bot.afk.get(view.guild.id, view.author.id)
+        is not None
+    )
+    async def afk_user_messaage(self, view: MessageView):
         """
         Responsible for checking if a message was sent by an AFK user.
         If so, the bot will send a message to the channel informing the user
@@ -81,24 +97,15 @@ class ListenerCog(commands.Cog, command_attrs=dict(hidden=True)):
 
         Parameters
         ----------
-        message : discord.Message
+        view : MessageView
             The message that was sent.
         """
-        if message.author.bot or not message.guild:
-            return
-        record = self.bot.afk_cache.get(message.guild.id)
-        if record:
-            record = record.get(message.author.id)
+        message = view.message
+        record = self.bot.afk.get(message.guild.id, message.author.id)
         if record:
-            _, time = record
-            if (unitime.time() - time) < 30:
+            if (unitime.time() - record.since) < 30:
                 return
-            await self.bot.conn.delete_record(
-                "afk",
-                table="afk",
-                where=("user_id",),
-                values=(message.author.id,),
-            )
+            await self.bot.afk.remove(message.guild.id, message.author.id)
             with contextlib.suppress(discord.HTTPException, discord.Forbidden):
                 if "[AFK]" in message.author.display_name:
                     name = message.author.display_name.split(" ")[1:]
@@ -108,7 +115,6 @@ class ListenerCog(commands.Cog, command_attrs=dict(hidden=True)):
             #     on_pat_staff = message.guild.get_role(726441123966484600)
             #     with contextlib.suppress(discord.Forbidden, discord.HTTPException):
             #         await message.author.add_roles(on_pat_staff)
-            del self.bot.afk_cache[message.guild.id][message.author.id]
             em = discord.Embed(
                 description=f"{message.author.mention} Welcome back, "
                 "I removed your AFK!",
@@ -118,33 +124,35 @@ class ListenerCog(commands.Cog, command_attrs=dict(hidden=True)):
             await asyncio.sleep(5)
             await msg.delete()
 
-    @commands.Cog.listener("on_message")
-    async def user_mentioned(self, message: discord.Message):
+    @message_handler(
+        when=lambda self, view: bool(view.message.mentions)
+        and self.bot.afk.in_guild(view.guild.id)
+    )
+    async def user_mentioned(self, view: MessageView):
         """
-        Responsible for checking if an AFK user was mentioned in a message.
-        If so, the bot will send a message to the channel informing that the user
-        that was mentioned is AFK.
+        Responsible for checking if AFK users were mentioned in a message.
+        If so, the bot will send one message to the channel informing that
+        the users that were mentioned are AFK.
 
         Parameters
         ----------
-        message : discord.Message
+        view : MessageView
             The message that was sent.
         """
-        if message.author.bot or not message.guild:
+        message = view.message
+        afk = self.bot.afk.mentioned(
+            message.guild.id, (member.id for member in message.mentions)
+        )
+        if not afk:
             return
-        if message.mentions:
-            for member in message.mentions:
-                record = self.bot.afk_cache.get(message.guild.id)
-                if record:
-                    record = record.get(member.id)
-                    if record:
-                        reason, time_ = record
-                        em = discord.Embed(
-                            description=f"{member.mention} is AFK: {reason} "
-                            f"(<t:{time_}:R>)",
-                            color=discord.Color.dark_blue(),
-                        )
-                        await message.reply(embed=em)
+        em = discord.Embed(
+            description="\n".join(
+                f"<@{user_id}> is AFK: {record.reason} (<t:{record.since}:R>)"
+                for user_id, record in afk
+            ),
+            color=discord.Color.dark_blue(),
+        )
+        await message.reply(embed=em)
 
     @commands.Cog.listener()
     async def on_message_edit(
@@ -152,8 +160,7 @@ class ListenerCog(commands.Cog, command_attrs=dict(hidden=True)):
     ) -> None:
         """
         Responsible for checking if a message was edited.
-        If so, the bot will check if message cache of bot has exceeded 200.
-        If so, the bot will clear the cache.
+        If so, the bot will re-invoke the command of the edited message.
 
         Parameters
         ----------
@@ -164,8 +171,6 @@ class ListenerCog(commands.Cog, command_attrs=dict(hidden=True)):
         """
         if after.author.bot:
             return
-        if len(self.bot.message_cache) > 200:
-            self.bot.message_cache.clear()
         await self.bot.process_edit(before, after)
 
     @commands.Cog.listener()
@@ -193,45 +198,30 @@ class ListenerCog(commands.Cog, command_attrs=dict(hidden=True)):
                 color=discord.Color.red(),
             )
             return await ctx.send(embed=embed, ephemeral=True)
+        elif isinstance(error, CircuitOpenError):
+            embed = discord.Embed(
+                title="Service Unavailable",
+                description=f"{ctx.author.mention} `{error.host}` is not responding "
+                "right now, please try again later.",
+                color=discord.Color.red(),
+            )
+            return await ctx.send(embed=embed, ephemeral=True)
         else:
             print(f"Ignoring exception in command {ctx.command}:", file=sys.stderr)
             traceback.print_exception(
                 type(error), error, error.__traceback__, file=sys.stderr
             )
 
-    @commands.Cog.listener("on_message")
-    async def track_sent_message(self, message: discord.Message):
+    @message_handler()
+    async def track_sent_message(self, view: MessageView):
         """
         Responsible for tracking staff messages.
         """
-
-        if message.author.bot or not message.guild:
-            return
-
-        values = [message.author.id, message.guild.id, 1, 1]
-        columns = [
-            "user_id",
-            "guild_id",
-            "message_count",
-            status := message.author.status.name,
-        ]
-
-        staff_role = message.guild.get_role(TCR_STAFF_ROLE_ID)
-        if staff_role and staff_role in message.author.roles:  # type: ignore
-            columns.append("is_staff")
-            values.append(1)
-        else:
-            pass
-
-        return await self.bot.conn.insert_record(
-            "metrics",
-            table="message_metric",
-            columns=columns,
-            values=values,
-            extras=[
-                "ON CONFLICT (user_id, guild_id) DO UPDATE SET message_count = "
-                f"message_count + 1, {status} = {status} + 1"
-            ],
+        await self.bot.conn.aggregator.record_message(
+            view.author.id,
+            view.guild.id,
+            status=view.author.status.name,
+            is_staff=view.is_staff,
         )
 
     @commands.Cog.listener("on_message_delete")
@@ -243,16 +233,8 @@ class ListenerCog(commands.Cog, command_attrs=dict(hidden=True)):
         if message.author.bot or not message.guild:
             return
 
-        values = [message.author.id, message.guild.id]
-
-        columns = ["deleted_message_count = deleted_message_count + 1"]
-
-        await self.bot.conn.update_record(
-            "metrics",
-            table="message_metric",
-            to_update=columns,
-            where=["user_id", "guild_id"],
-            values=values,
+        await self.bot.conn.aggregator.record_deleted(
+            message.author.id, message.guild.id
         )
 
     @commands.Cog.listener("on_message_edit")
@@ -262,54 +244,49 @@ class ListenerCog(commands.Cog, command_attrs=dict(hidden=True)):
         """
         if after.author.bot or not after.guild:
             return
-        perms = after.channel.permissions_for(after.author).manage_guild
-        if (await check_invite(self.bot, after.content, after.channel)) and (not perms):
-            invite_regex = (
-                "(?:https?://)?discord(?:app)?\.(?:com/invite|gg)/[a-zA-Z0-9]+/?"
+        codes = find_invite_codes(after.content)
+        if not codes or after.channel.permissions_for(after.author).manage_guild:
+            return
+        if await check_invite(self.bot, after.content, after.channel, codes=codes):
+            await after.delete()
+            return await after.channel.send(
+                "Please don't send invite links in this server!", delete_after=5
             )
-            if re.search(invite_regex, after.content):
-                await after.delete()
-                return await after.channel.send(
-                    "Please don't send invite links in this server!", delete_after=5
-                )
-
-    @commands.Cog.listener("on_message")
-    async def invite_in_message(self, message: discord.Message):
+
+    @message_handler(when=lambda self, view: bool(view.invite_codes))
+    async def invite_in_message(self, view: MessageView):
         """
         Responsible for tracking member joins.
         """
-        if message.author.bot or not message.guild:
+        if view.can_manage_guild:
             return
-        perms = message.channel.permissions_for(message.author).manage_guild
-        if (await check_invite(self.bot, message.content, message.channel)) and (
-            not perms
+        message = view.message
+        if await check_invite(
+            self.bot, message.content, message.channel, codes=view.invite_codes
         ):
-            invite_regex = (
-                "(?:https?://)?discord(?:app)?\.(?:com/invite|gg)/[a-zA-Z0-9]+/?"
+            await message.delete()
+            return await message.channel.send(
+                "Please don't send invite links in this server!", delete_after=5
             )
-            if re.search(
-                invite_regex, message.content
-            ):  # `check_invite` already checks if there is an invite,
-                # why are we checking again?
-                await message.delete()
-                return await message.channel.send(
-                    "Please don't send invite links in this server!", delete_after=5
-                )
-
-    @commands.Cog.listener("on_message")
-    async def repo_mention(self, message: discord.Message):
+
+    @message_handler(
+        when=lambda self, view: "repo:" in view.lowered,
+        guild_only=False,
+    )
+    async def repo_mention(self, view: MessageView):
         """
         Format: repo:user/repo
 
         Responds with a link to the repo.
         """
-        if "repo:" in message.content.lower():
-            repo = message.content.lower().split("repo:")[1].strip().split(" ")[0]
-            for sect in filter(None, repo.split("/")):
-                if not self.valid_gh_sect(sect):
-                    return
-            url = f"https://github.com/{repo}"
-            await message.channel.send(url)
+        repo = view.lowered.split("repo:")[1].strip().split(" ")[0]
+        for sect in filter(None, repo.split("/")):
+            if not self.valid_gh_sect(sect):
+                return
+        if not self.bot.budget.allow("repo_mention", view.channel.id):
+            return
+        url = f"https://github.com/{repo}"
+        await view.channel.send(url)
 
 
 async def setup(bot: CodingBot):
@@ -12,8 +12,7 @@ import contextlib
 import discord
 from discord.ext import commands
 from ext.helpers import Spotify, grouper, ordinal_suffix_of, gemini_split_string, get_lyrics, find_surrounding_lyrics, filter_banned_words
-from ext.http import Http
-from ext.ui.view import Piston
+from ext.ui.view import KeysetPaginator, Piston
 import time
 import google.generativeai as genai
 import button_paginator as pg
@@ -66,7 +65,7 @@ class Miscellaneous(commands.Cog, command_attrs=dict(hidden=False)):
 
     def __init__(self, bot: CodingBot) -> None:
         self.bot = bot
-        self.http = Http(bot.session)
+        self.http = bot.http_client
         self.regex = {
             "codeblock": re.compile(r"(\w*)\s*(?:```)(\w*)?([\s\S]*)(?:```$)")
         }
@@ -132,26 +131,15 @@ class Miscellaneous(commands.Cog, command_attrs=dict(hidden=False)):
         # if staff_role in member.roles:
         #     with contextlib.suppress(discord.Forbidden, discord.HTTPException):
         #         await member.remove_roles(on_pat_staff)
-        if ctx.guild.id not in self.bot.afk_cache:
-            self.bot.afk_cache[ctx.guild.id] = {}
-        if member.id not in self.bot.afk_cache.get(ctx.guild.id):
-            await self.bot.conn.insert_record(
-                "afk",
-                table="afk",
-                values=(member.id, reason, int(ctx.message.created_at.timestamp())),
-                columns=["user_id", "reason", "afk_time"],
+        if self.bot.afk.get(ctx.guild.id, member.id) is None:
+            await self.bot.afk.set(
+                ctx.guild.id,
+                member.id,
+                reason,
+                int(ctx.message.created_at.timestamp()),
             )
             with contextlib.suppress(Exception):
                 await member.edit(nick=f"[AFK] {member.display_name}")
-            try:
-                self.bot.afk_cache[ctx.guild.id][member.id] = (
-                    reason,
-                    int(ctx.message.created_at.timestamp()),
-                )
-            except KeyError:
-                self.bot.afk_cache[ctx.guild.id] = {
-                    member.id: (reason, int(ctx.message.created_at.timestamp()))
-                }
             embed = discord.Embed(
                 description=f"{ctx.author.mention} I set your AFK: {reason}",
                 color=discord.Color.blue(),
@@ -215,44 +203,46 @@ class Miscellaneous(commands.Cog, command_attrs=dict(hidden=False)):
         elif member.id == self.bot.user.id:
             return await ctx.reply("You can't thank me.", ephemeral=True)
 
-        await self.bot.conn.insert_record(
-            "thanks",
-            table="thanks_info",
-            values=(member.id, ctx.guild.id, 1),
-            columns=["user_id", "guild_id", "thanks_count"],
-            extras=[
-                "ON CONFLICT (user_id) DO UPDATE SET thanks_count = thanks_count + 1"
-            ],
-        )
         staff_role = ctx.guild.get_role(795145820210462771)
         member_is_staff = 1 if staff_role and staff_role in member.roles else 0
         characters = string.ascii_letters + string.digits
-        await self.bot.conn.insert_record(
-            "thanks",
-            table="thanks_data",
-            columns=(
-                "is_staff",
-                "user_id",
-                "giver_id",
-                "guild_id",
-                "message_id",
-                "channel_id",
-                "reason",
-                "thank_id",
-                "date",
-            ),
-            values=(
-                member_is_staff,
-                member.id,
-                ctx.author.id,
-                ctx.guild.id,
-                ctx.message.id,
-                ctx.channel.id,
-                reason or "No reason given",
-                "".join(random.choice(characters) for _ in range(7)),
-                int(ctx.message.created_at.timestamp()),
-            ),
-        )
+        async with self.bot.conn.transaction("thanks"):
+            await self.bot.conn.insert_record(
+                "thanks",
+                table="thanks_info",
+                values=(member.id, ctx.guild.id, 1),
+                columns=["user_id", "guild_id", "thanks_count"],
+                extras=[
+                    "ON CONFLICT (user_id) DO UPDATE "
+                    "SET thanks_count = thanks_count + 1"
+                ],
+            )
+            await self.bot.conn.insert_record(
+                "thanks",
+                table="thanks_data",
+                columns=(
+                    "is_staff",
+                    "user_id",
+                    "giver_id",
+                    "guild_id",
+                    "message_id",
+                    "channel_id",
+                    "reason",
+                    "thank_id",
+                    "date",
+                ),
+                values=(
+                    member_is_staff,
+                    member.id,
+                    ctx.author.id,
+                    ctx.guild.id,
+                    ctx.message.id,
+                    ctx.channel.id,
+                    reason or "No reason given",
+                    "".join(random.choice(characters) for _ in range(7)),
+                    int(ctx.message.created_at.timestamp()),
+                ),
+            )
         await ctx.reply(
             f"{ctx.author.mention} you thanked {member.mention}!", ephemeral=True
         )
@@ -269,32 +259,28 @@ class Miscellaneous(commands.Cog, command_attrs=dict(hidden=False)):
         ------
         `{prefix}thank show {user}`: *will show the thanks information of user*
         """
-        records = await self.bot.conn.select_record(
-            "thanks",
-            table="thanks_data",
-            arguments=(
-                "giver_id",
-                "message_id",
-                "channel_id",
-                "reason",
-                "thank_id",
-                "date",
-            ),
-            where=["user_id"],
-            values=[member.id],
-        )
-
-        if not records:
-            return await ctx.reply(
-                f"{member.mention} does not have any thanks.", ephemeral=True
+        async def fetch_page(after):
+            return await self.bot.conn.select_page(
+                "thanks",
+                table="thanks_data",
+                arguments=(
+                    "giver_id",
+                    "message_id",
+                    "channel_id",
+                    "reason",
+                    "thank_id",
+                    "date",
+                ),
+                where=["user_id"],
+                values=[member.id],
+                order_by=("date", "rowid"),
+                after=after,
+                limit=5,
             )
 
-        information = tuple(grouper(5, records))
-
-        embeds = []
-        for info in information:
+        def build_embed(records, page):
             embed = discord.Embed(title=f"Showing {member.display_name}'s data")
-            for data in info:
+            for data in records:
                 giver_id = data.giver_id
                 msg_id = data.message_id
                 channel_id = data.channel_id
@@ -316,17 +302,23 @@ class Miscellaneous(commands.Cog, command_attrs=dict(hidden=False)):
                     f"Message link: [Click here!]({msg_link})",
                     inline=False,
                 )
+            embed.set_footer(text=f"Page {page + 1}")
+            return embed
 
-            embeds.append(embed)
+        first_page = await fetch_page(None)
+        records, next_key = first_page
+        if not records:
+            return await ctx.reply(
+                f"{member.mention} does not have any thanks.", ephemeral=True
+            )
 
-        if len(embeds) == 1:
-            await self.bot.reply(ctx, embed=embeds[0])
+        if next_key is None:
+            await self.bot.reply(ctx, embed=build_embed(records, 0))
         else:
-            paginator = pg.Paginator(self.bot, embeds, ctx)
-            paginator.add_button("back", emoji="◀️")
-            paginator.add_button("goto", style=discord.ButtonStyle.primary)
-            paginator.add_button("next", emoji="▶️")
-            await paginator.start()
+            view = KeysetPaginator(
+                ctx.author, fetch_page, build_embed, first_page=first_page
+            )
+            view.message = await ctx.reply(embed=view.embed, view=view)
 
     @thank.command(name="delete")
     @commands.has_any_role(783909939311280129, 797688360806121522)
@@ -340,31 +332,36 @@ class Miscellaneous(commands.Cog, command_attrs=dict(hidden=False)):
          *will delete the thank with the id [thank_id]*
 
         """
-        record = await self.bot.conn.select_record(
-            "thanks",
-            table="thanks_data",
-            arguments=["user_id"],
-            where=["thank_id"],
-            values=[thank_id],
-        )
+        async with self.bot.conn.transaction("thanks"):
+            record = await self.bot.conn.select_record(
+                "thanks",
+                table="thanks_data",
+                arguments=["user_id"],
+                where=["thank_id"],
+                values=[thank_id],
+            )
+            if record:
+                user_id = record[0].user_id
+
+                await self.bot.conn.delete_record(
+                    "thanks",
+                    table="thanks_data",
+                    where=["thank_id"],
+                    values=[thank_id],
+                )
+
+                await self.bot.conn.insert_record(
+                    "thanks",
+                    table="thanks_info",
+                    values=(user_id, ctx.guild.id, -1),
+                    columns=["user_id", "guild_id", "thanks_count"],
+                    extras=[
+                        "ON CONFLICT (user_id) DO UPDATE "
+                        "SET thanks_count = thanks_count - 1"
+                    ],
+                )
         if not record:
             return await ctx.send("No thank with that id")
-
-        user_id = record[0].user_id
-
-        await self.bot.conn.delete_record(
-            "thanks", table="thanks_data", where=["thank_id"], values=[thank_id]
-        )
-
-        await self.bot.conn.insert_record(
-            "thanks",
-            table="thanks_info",
-            values=(user_id, ctx.guild.id, -1),
-            columns=["user_id", "guild_id", "thanks_count"],
-            extras=[
-                "ON CONFLICT (user_id) DO UPDATE SET thanks_count = thanks_count - 1"
-            ],
-        )
         await ctx.send(f"Remove thank from <@{user_id}> with id {thank_id}")
 
     @thank.command(name="leaderboard", aliases=["lb"])
@@ -557,13 +554,13 @@ class Miscellaneous(commands.Cog, command_attrs=dict(hidden=False)):
             duration = time.time()-spotify_activity.start.timestamp()
             song_title = spotify_activity.title
             song_artist = spotify_activity.artist
-            lyr = get_lyrics(song_title, song_artist)
+            lyr = await get_lyrics(self.bot.http_client, song_title, song_artist)
             if not lyr:
                 return await ctx.send(f"Lyrics not found for song - {song_title} - {song_artist}")
             if lyr[1] == 1:
                 lyr = "\n".join(find_surrounding_lyrics(lyr[0], int(duration)))
             else:
-                lyr = "\n".join(lyr.splitlines()[0:5])
+                lyr = "\n".join(lyr[0].splitlines()[0:5])
 
             lyr = filter_banned_words(lyr)
             embed = discord.Embed(description = lyr, title = f"{song_title} - {song_artist}", color = spotify_activity.color)
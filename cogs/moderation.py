@@ -12,7 +12,7 @@ from discord.ext import commands
 from ext.errors import InsufficientPrivilegeError
 from ext.models import CodingBot, TimeConverter
 from ext.ui.view import ConfirmButton
-from ext.consts import TCR_MEMBER_ROLE_ID
+from ext.consts import FLOOD_TIMEOUT, TCR_MEMBER_ROLE_ID
 
 
 def trainee_check():
@@ -198,6 +198,56 @@ class Moderation(commands.Cog, command_attrs=dict(hidden=False)):
         logs = self.bot.get_channel(760186182343852032)  # 760186182343852032
         await logs.send(text, file=file)  # type: ignore
 
+    async def timeout_member(
+        self,
+        member: discord.Member,
+        duration: datetime.timedelta,
+        *,
+        reason: Optional[str] = None,
+    ) -> None:
+        """
+        Notifies a member and times them out, shared by the mute command
+        and the flood detector
+
+        Parameters
+        ----------
+        member : discord.Member
+            The member to time out
+        duration : datetime.timedelta
+            How long the timeout lasts
+        reason : Optional[str]
+            The reason sent to the member and shown in the audit log
+        """
+        with contextlib.suppress(discord.Forbidden):
+            await member.send(
+                "You have been :mute: **Muted** :hammer: from "
+                f"**{member.guild.name}**. \nReason: {reason}"
+            )
+        await member.timeout(discord.utils.utcnow() + duration, reason=reason)
+
+    @commands.Cog.listener()
+    async def on_message_flood(self, message: discord.Message, reason: str):
+        # The message skipped every handler, including the invite filter
+        with contextlib.suppress(discord.HTTPException):
+            await message.delete()
+        member = message.author
+        if not isinstance(member, discord.Member) or member.is_timed_out():
+            return
+        duration = datetime.timedelta(seconds=FLOOD_TIMEOUT)
+        reason = f"Flooding: {reason}"
+        try:
+            await self.timeout_member(member, duration, reason=reason)
+        except (discord.Forbidden, discord.HTTPException):
+            return
+        await self.log(
+            action="mute",
+            moderator=member.guild.me,
+            member=member,
+            undo=False,
+            reason=reason,
+            duration=duration,
+        )
+
     @trainee_check()
     @commands.hybrid_command(name="kick")
     @commands.has_permissions(kick_members=True)
@@ -332,27 +382,18 @@ class Moderation(commands.Cog, command_attrs=dict(hidden=False)):
         if check_made := self.check_member_permission(ctx, member):
             return await self.bot.reply(ctx, check_made)
 
-        try:
-            await member.send(
-                "You have been :mute: **Muted** :hammer: from "
-                f"**{ctx.guild.name}**. \nReason: {reason}"
-            )
-        except discord.Forbidden:
-            pass
-        else:
-            until: datetime.datetime = discord.utils.utcnow() + duration  # type: ignore
-            await member.timeout(until)
-            await self.bot.reply(ctx, f"Muted {member.mention}")
-            evidence = await self.capture_evidence(ctx)
-            await self.log(
-                action="mute",
-                moderator=ctx.author,
-                member=member,
-                undo=False,
-                reason=reason,
-                duration=duration,
-                evidence=evidence,
-            )
+        await self.timeout_member(member, duration, reason=reason)  # type: ignore
+        await self.bot.reply(ctx, f"Muted {member.mention}")
+        evidence = await self.capture_evidence(ctx)
+        await self.log(
+            action="mute",
+            moderator=ctx.author,
+            member=member,
+            undo=False,
+            reason=reason,
+            duration=duration,
+            evidence=evidence,
+        )
 
     @trainee_check()
     @commands.hybrid_command(name="unmute")
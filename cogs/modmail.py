@@ -1,39 +1,80 @@
+import asyncio
 import typing
 from ext.consts import MODMAIL_CHANNEL_ID, MODMAIL_ROLE_ID, MODMAIL_CLOSED, MODMAIL_OPEN
 from discord.ext import commands
 import discord
+from ext.dispatch import MessageView, message_handler
+from ext.modmail import ModMailSessions
 from ext.ui.view import YesNoView
 
-def none_if_error(func):
-    def wrapper(*args, **kwargs):
-        try:
-            return func(*args, **kwargs)
-        except Exception:
-            return None
-
-    return wrapper
-
 class ModMail(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.sessions = [] # [{user: discord.Member, thread: discord.Thread}]
+        self.sessions = ModMailSessions(bot)
         self.channel: typing.Optional[discord.ForumChannel] = None
+        # Relaying webhook per forum, resolved once instead of per message
+        self.webhooks: typing.Dict[int, discord.Webhook] = {}
+        self._webhook_lock = asyncio.Lock()
 
-    @none_if_error
-    def get_thread(self, user) -> discord.Thread | None:
-        return [i['thread'] for i in self.sessions if i['user'] == user][0]
+    async def cog_load(self) -> None:
+        await self.sessions.load()
+        self.bot.dispatcher.add_cog(self)
 
-    @none_if_error
-    def get_user(self, thread) -> discord.Member | discord.User | None:
-        return [i['user'] for i in self.sessions if i['thread'] == thread][0]
+    async def cog_unload(self) -> None:
+        self.bot.dispatcher.remove_cog(self)
+
+    async def get_thread(self, user) -> discord.Thread | None:
+        thread_id = self.sessions.thread_id(user.id)
+        if thread_id is None:
+            return None
+        if thread := self.bot.get_channel(thread_id):
+            return thread
+        try:
+            return await self.bot.fetch_channel(thread_id)
+        except discord.NotFound:
+            # The thread was deleted while the ticket was open
+            await self.sessions.close(thread_id)
+        except discord.HTTPException:
+            pass
+        return None
+
+    async def get_user(self, thread) -> discord.Member | discord.User | None:
+        user_id = self.sessions.user_id(thread.id)
+        if user_id is None:
+            return None
+        if user := self.bot.get_user(user_id):
+            return user
+        try:
+            return await self.bot.fetch_user(user_id)
+        except discord.HTTPException:
+            return None
+
+    async def get_webhook(self, forum: discord.ForumChannel) -> discord.Webhook:
+        if webhook := self.webhooks.get(forum.id):
+            return webhook
+        async with self._webhook_lock:
+            # Another message may have resolved it while this one waited
+            if webhook := self.webhooks.get(forum.id):
+                return webhook
+            webhook = discord.utils.find(
+                lambda hook: hook.type is discord.WebhookType.incoming and hook.token,
+                await forum.webhooks(),
+            )
+            if webhook is None:
+                webhook = await forum.create_webhook(name="ModMail")
+            self.webhooks[forum.id] = webhook
+            return webhook
+
+    @commands.Cog.listener()
+    async def on_webhooks_update(self, channel: discord.abc.GuildChannel):
+        self.webhooks.pop(channel.id, None)
 
     async def send_webhook_message(
             self, 
             message: discord.Message, 
             thread: discord.Thread
             ):
-        webhook = (await thread.parent.webhooks())[0]
-        await webhook.send(
+        kwargs = dict(
             username=message.author.name,
             content=message.content,
             avatar_url=message.author.display_avatar.url,
@@ -43,22 +84,30 @@ class ModMail(commands.Cog):
             ),
             thread=thread,
         )
+        webhook = await self.get_webhook(thread.parent)
+        try:
+            await webhook.send(**kwargs)
+        except discord.NotFound:
+            # The cached webhook was deleted before the update event arrived
+            self.webhooks.pop(thread.parent.id, None)
+            webhook = await self.get_webhook(thread.parent)
+            await webhook.send(**kwargs)
         await message.add_reaction("✅")
 
     async def close_thread(self, thread: discord.Thread):
         await thread.add_tags(thread.parent.get_tag(MODMAIL_CLOSED))
         await thread.remove_tags(thread.parent.get_tag(MODMAIL_OPEN))
         await thread.edit(locked=True, archived=True)
-        self.sessions.remove({'user': self.get_user(thread), 'thread': thread})
+        await self.sessions.close(thread.id)
 
     @commands.hybrid_command()
     async def close(self, ctx: commands.Context):
-        if not ctx.guild and (thread := self.get_thread(ctx.author)):
+        if not ctx.guild and (thread := await self.get_thread(ctx.author)):
             await thread.send("This ticket has been closed by the user.")
             await self.close_thread(thread)
             await ctx.send("Your modmail ticket has successfully closed!")
 
-        elif member := self.get_user(ctx.channel):
+        elif member := await self.get_user(ctx.channel):
             view = YesNoView(
                 yes_message="Your modmail ticket has successfully closed!",
                 no_message="Aborted.",
@@ -70,25 +119,27 @@ class ModMail(commands.Cog):
             else:
                 await ctx.channel.send("Member refused to close the ticket.")
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
+    @message_handler(
+        when=lambda self, view: not view.is_command
+        and (not view.guild or self.sessions.is_thread(view.channel.id)),
+        guild_only=False,
+    )
+    async def on_message(self, view: MessageView):
+        message = view.message
         if not self.channel:  
             self.channel: discord.ForumChannel = self.bot.get_channel(MODMAIL_CHANNEL_ID)
 
-        if message.author.bot or message.content.startswith(self.bot.command_prefix[0]):
-            return
-
         if not message.guild:
-            if not (thread := self.get_thread(message.author)):
-                view = YesNoView(
+            if not (thread := await self.get_thread(message.author)):
+                confirm = YesNoView(
                     yes_message="Your modmail ticket has been successfully created!",
                     no_message="Aborted.",
                 )
                 await message.author.send(
-                    "Do you want to create a modmail ticket?", view=view
+                    "Do you want to create a modmail ticket?", view=confirm
                 )
-                await view.wait()
-                if view.yes:
+                await confirm.wait()
+                if confirm.yes:
                     thread, _ = await self.channel.create_thread(
                         name=f"Mods vs @{message.author.name}", 
                         content="New ModMail ticket created by "\
@@ -98,11 +149,11 @@ class ModMail(commands.Cog):
                     )
                     await self.send_webhook_message(message, thread)
 
-                    self.sessions.append({'user': message.author, 'thread': thread})
+                    await self.sessions.open(message.author.id, thread.id)
             else:
                 await self.send_webhook_message(message, thread)
 
-        elif member := self.get_user(message.channel):
+        elif member := await self.get_user(message.channel):
             await member.send(
                 f"⚒️ @{message.author.name}: " + message.content, 
                 files=message.attachments
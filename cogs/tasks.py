@@ -2,12 +2,12 @@ from __future__ import annotations
 
 import datetime
 import random
+import time
 
 import discord
 from discord.ext import commands, tasks
 from typing import TYPE_CHECKING
-from ext.consts import TCR_GUILD_ID
-from ext.http import Http
+from ext.consts import TCR_GUILD_ID, WARNING_EXPIRY
 
 
 if TYPE_CHECKING:
@@ -18,7 +18,7 @@ class TaskCog(commands.Cog, command_attrs=dict(hidden=True)):
     hidden = True
 
     def __init__(self, bot: CodingBot) -> None:
-        self.http = Http(bot.session)
+        self.http = bot.http_client
         self.bot = bot
 
     async def cog_load(self) -> None:
@@ -104,7 +104,7 @@ class TaskCog(commands.Cog, command_attrs=dict(hidden=True)):
 
     @tasks.loop(hours = 24)
     async def send_cat_pic(self):
-        data = await self.http.api["cat-api"]["api"]()
+        data = await self.http.prefetch["cat"].get()
         cat_pic = data[0]["url"]
 
         channel = self.bot.get_channel(743817386792058971) # #lounge
@@ -129,23 +129,22 @@ class TaskCog(commands.Cog, command_attrs=dict(hidden=True)):
     async def remove_inactive_warns(self):
         await self.bot.wait_until_ready()
 
-        records = await self.bot.conn.select_record(
-            "warnings",
-            arguments=("date", "user_id"),
-            table="warnings",
-            where=("guild_id",),
-            values=(TCR_GUILD_ID,),
-        )
+        started = time.perf_counter()
         now = datetime.datetime.now(datetime.timezone.utc).timestamp()
-        if records:
-            for record in records:
-                if record.date + (60 * 60 * 24 * 31) < now:
-                    await self.bot.conn.delete_record(
-                        "warnings",
-                        table="warnings",
-                        where=("guild_id", "user_id", "date"),
-                        values=(TCR_GUILD_ID, record.user_id, record.date),
-                    )
+        removed = {}
+        async with self.bot.conn.transaction("warnings"):
+            for table in ("warnings", "help_warns"):
+                removed[table] = await self.bot.conn.delete_record(
+                    "warnings",
+                    table=table,
+                    where=("guild_id", "date < ?"),
+                    values=(TCR_GUILD_ID, int(now - WARNING_EXPIRY)),
+                )
+        self.bot.logger.info(
+            f"Removed {removed['warnings']} warnings and "
+            f"{removed['help_warns']} helper warnings "
+            f"in {time.perf_counter() - started:.3f}s"
+        )
 
     @remove_inactive_warns.before_loop
     async def before_remove_inactive_warns(self):
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .models import CodingBot
+
+
+__all__ = ("AfkEntry", "AfkStore")
+
+
+class AfkEntry(NamedTuple):
+    reason: str
+    since: int
+
+
+class AfkStore:
+    """
+    The AFK members of every guild, persisted in the ``afk`` table
+    and kept in memory for lookups on every message.
+
+    Attributes
+    ----------
+    bot : CodingBot
+        The bot whose database holds the ``afk`` table
+    entries : Dict[Tuple[int, int], AfkEntry]
+        The AFK members, keyed by (guild_id, user_id)
+    """
+
+    def __init__(self, bot: CodingBot) -> None:
+        self.bot = bot
+        self.entries: Dict[Tuple[int, int], AfkEntry] = {}
+        # AFK members per guild, lets messages skip the mention check
+        self._guilds: Counter[int] = Counter()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __repr__(self) -> str:
+        return f"<AfkStore: {len(self)} members>"
+
+    async def load(self) -> int:
+        """
+        Loads every AFK member from the database, called once at startup
+
+        Returns
+        -------
+        int
+            The number of AFK members loaded
+        """
+        self.entries.clear()
+        self._guilds.clear()
+        async for record in self.bot.conn.iter_records(
+            "afk",
+            table="afk",
+            arguments=("guild_id", "user_id", "reason", "afk_time"),
+            batch_size=500,
+        ):
+            self._add(record.guild_id, record.user_id, record.reason, record.afk_time)
+        return len(self.entries)
+
+    def _add(self, guild_id: int, user_id: int, reason: str, since: int) -> None:
+        if (guild_id, user_id) not in self.entries:
+            self._guilds[guild_id] += 1
+        self.entries[guild_id, user_id] = AfkEntry(reason, since)
+
+    def get(self, guild_id: int, user_id: int) -> Optional[AfkEntry]:
+        return self.entries.get((guild_id, user_id))
+
+    def in_guild(self, guild_id: int) -> bool:
+        """
+        Whether anyone in the guild is AFK
+        """
+        return self._guilds[guild_id] > 0
+
+    def mentioned(
+        self, guild_id: int, user_ids: Iterable[int]
+    ) -> List[Tuple[int, AfkEntry]]:
+        """
+        Returns the AFK members among the given users, in order and once each
+
+        Parameters
+        ----------
+        guild_id : int
+            The guild the users were mentioned in
+        user_ids : Iterable[int]
+            The mentioned users
+
+        Returns
+        -------
+        List[Tuple[int, AfkEntry]]
+            The user id and AFK entry of every mentioned AFK member
+        """
+        if not self.in_guild(guild_id):
+            return []
+        return [
+            (user_id, entry)
+            for user_id in dict.fromkeys(user_ids)
+            if (entry := self.entries.get((guild_id, user_id))) is not None
+        ]
+
+    async def set(self, guild_id: int, user_id: int, reason: str, since: int) -> None:
+        await self.bot.conn.insert_record(
+            "afk",
+            table="afk",
+            values=(guild_id, user_id, reason, since),
+            columns=["guild_id", "user_id", "reason", "afk_time"],
+            extras=[
+                "ON CONFLICT (guild_id, user_id) DO UPDATE "
+                "SET reason = excluded.reason, afk_time = excluded.afk_time"
+            ],
+        )
+        self._add(guild_id, user_id, reason, since)
+
+    async def remove(self, guild_id: int, user_id: int) -> Optional[AfkEntry]:
+        entry = self.entries.pop((guild_id, user_id), None)
+        if entry is not None:
+            self._guilds[guild_id] -= 1
+            if not self._guilds[guild_id]:
+                del self._guilds[guild_id]
+        await self.bot.conn.delete_record(
+            "afk",
+            table="afk",
+            where=("guild_id", "user_id"),
+            values=(guild_id, user_id),
+        )
+        return entry
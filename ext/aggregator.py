@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from discord.ext import tasks
+
+from .consts import METRIC_FLUSH_INTERVAL, METRIC_FLUSH_ROWS
+
+if TYPE_CHECKING:
+    from .models import Database
+
+
+__all__ = ("MetricAggregator",)
+
+
+STATUS_COLUMNS = ("offline", "online", "dnd", "idle")
+
+# Layout of a pending row, after (user_id, guild_id)
+MESSAGES, DELETED, IS_STAFF = 0, 1, 6
+STATUS_OFFSET = 2
+
+UPSERT_METRIC_STATEMENT = """
+    INSERT INTO message_metric (
+        user_id, guild_id, message_count, deleted_message_count,
+        offline, online, dnd, idle, is_staff
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (user_id, guild_id) DO UPDATE SET
+        message_count = message_count + excluded.message_count,
+        deleted_message_count = deleted_message_count
+            + excluded.deleted_message_count,
+        offline = offline + excluded.offline,
+        online = online + excluded.online,
+        dnd = dnd + excluded.dnd,
+        idle = idle + excluded.idle
+"""
+
+# Deletes on their own never create a row, same as the old update_record call
+UPDATE_DELETED_STATEMENT = """
+    UPDATE message_metric
+    SET deleted_message_count = deleted_message_count + ?
+    WHERE user_id = ? AND guild_id = ?
+"""
+
+
+class MetricAggregator:
+    """
+    Write-behind buffer for the ``message_metric`` table.
+
+    Message and deleted-message events are summed in memory per
+    (user_id, guild_id) and written as one ``executemany`` transaction,
+    either every ``interval`` seconds or once ``max_rows`` rows are pending.
+
+    Attributes
+    ----------
+    database : Database
+        The database holding the ``metrics`` connection
+    max_rows : int
+        The number of pending rows that triggers an early flush
+    pending : Dict[Tuple[int, int], List[int]]
+        The unflushed counters, keyed by (user_id, guild_id)
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        *,
+        interval: float = METRIC_FLUSH_INTERVAL,
+        max_rows: int = METRIC_FLUSH_ROWS,
+    ) -> None:
+        self.database = database
+        self.max_rows = max_rows
+        self.pending: Dict[Tuple[int, int], List[int]] = {}
+        self._lock = asyncio.Lock()
+        self.flush_loop.change_interval(seconds=interval)
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def _row(self, user_id: int, guild_id: int) -> List[int]:
+        key = (user_id, guild_id)
+        if (row := self.pending.get(key)) is None:
+            row = self.pending[key] = [0] * 7
+        return row
+
+    async def record_message(
+        self, user_id: int, guild_id: int, *, status: str, is_staff: bool
+    ) -> None:
+        """
+        Counts a sent message
+
+        Parameters
+        ----------
+        user_id : int
+            The ID of the author
+        guild_id : int
+            The ID of the guild
+        status : str
+            The name of the author's status, e.g. ``"online"``
+        is_staff : bool
+            Whether the author is a staff member
+        """
+        row = self._row(user_id, guild_id)
+        row[MESSAGES] += 1
+        if status in STATUS_COLUMNS:
+            row[STATUS_OFFSET + STATUS_COLUMNS.index(status)] += 1
+        else:
+            row[STATUS_OFFSET] += 1  # invisible and unknown count as offline
+        if is_staff:
+            row[IS_STAFF] = 1
+        if len(self.pending) >= self.max_rows:
+            await self.flush()
+
+    async def record_deleted(self, user_id: int, guild_id: int) -> None:
+        """
+        Counts a deleted message
+
+        Parameters
+        ----------
+        user_id : int
+            The ID of the author
+        guild_id : int
+            The ID of the guild
+        """
+        self._row(user_id, guild_id)[DELETED] += 1
+        if len(self.pending) >= self.max_rows:
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Writes every pending row in a single transaction
+
+        Returns
+        -------
+        int
+            The number of (user_id, guild_id) rows written
+        """
+        async with self._lock:
+            if not self.pending:
+                return 0
+            pending, self.pending = self.pending, {}
+            upserts = [(*key, *row) for key, row in pending.items() if row[MESSAGES]]
+            deletes = [
+                (row[DELETED], *key)
+                for key, row in pending.items()
+                if not row[MESSAGES]
+            ]
+            try:
+                async with self.database.transaction("metrics") as conn:
+                    if upserts:
+                        await conn.executemany(UPSERT_METRIC_STATEMENT, upserts)
+                    if deletes:
+                        await conn.executemany(UPDATE_DELETED_STATEMENT, deletes)
+            except Exception:
+                self._restore(pending)
+                raise
+            return len(pending)
+
+    def _restore(self, pending: Dict[Tuple[int, int], List[int]]) -> None:
+        # Put a failed batch back so it is retried with the next flush
+        for key, row in pending.items():
+            current = self._row(*key)
+            for i, value in enumerate(row):
+                current[i] = (
+                    max(current[i], value) if i == IS_STAFF else current[i] + value
+                )
+
+    @tasks.loop()
+    async def flush_loop(self) -> None:
+        # An unhandled error would stop the loop for good, the failed
+        # batch is already restored and is retried on the next iteration
+        try:
+            await self.flush()
+        except Exception:
+            self.database.bot.logger.exception("Failed to flush message metrics")
+
+    def start(self) -> None:
+        self.flush_loop.start()
+
+    async def close(self) -> None:
+        """
+        Stops the flush loop and writes whatever is still pending
+        """
+        self.flush_loop.stop()
+        await self.flush()
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from .cache import TTLCache
+from .consts import OUTBOUND_BUDGETS, OUTBOUND_GLOBAL_BUDGET, OUTBOUND_TRACKED_SIZE
+
+
+__all__ = ("TokenBucket", "OutboundBudget")
+
+
+class TokenBucket:
+    """
+    Allows ``capacity`` actions at once, refilled evenly over ``per`` seconds
+
+    Attributes
+    ----------
+    capacity : int
+        The most tokens the bucket holds
+    per : float
+        The seconds it takes to refill an empty bucket
+    tokens : float
+        The tokens left at the last update
+    """
+
+    __slots__ = ("capacity", "per", "tokens", "updated")
+
+    def __init__(self, capacity: int, per: float) -> None:
+        self.capacity = capacity
+        self.per = per
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def __repr__(self) -> str:
+        return f"<TokenBucket: {self.tokens:.1f}/{self.capacity} per {self.per:g}s>"
+
+    def refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        refilled = elapsed * self.capacity / self.per
+        self.tokens = min(self.capacity, self.tokens + refilled)
+        self.updated = now
+
+    def take(self, now: Optional[float] = None) -> bool:
+        """
+        Takes a token if one is left
+
+        Returns
+        -------
+        bool
+            Whether the action may go ahead
+        """
+        self.refill(time.monotonic() if now is None else now)
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class OutboundBudget:
+    """
+    Limits the automatic reactions and replies of the bot.
+
+    Every feature has a token bucket per channel, and all features share
+    one bucket, so a burst of cosmetic responses never uses up the rate
+    limit that moderation actions need. Responses over budget are dropped
+    and counted.
+
+    Attributes
+    ----------
+    budgets : Dict[str, Tuple[int, float]]
+        The capacity and refill time of the per channel bucket of each feature
+    allowed : Counter[str]
+        The responses sent per feature
+    dropped : Counter[str]
+        The responses dropped per feature
+    """
+
+    def __init__(
+        self,
+        budgets: Dict[str, Tuple[int, float]] = OUTBOUND_BUDGETS,
+        shared: Tuple[int, float] = OUTBOUND_GLOBAL_BUDGET,
+        tracked: int = OUTBOUND_TRACKED_SIZE,
+    ) -> None:
+        self.budgets = dict(budgets)
+        self.allowed: Counter[str] = Counter()
+        self.dropped: Counter[str] = Counter()
+        self.shared = TokenBucket(*shared)
+        # An idle bucket refills completely, so dropping it changes nothing
+        max_age = max((per for _, per in self.budgets.values()), default=0)
+        self._buckets: TTLCache[Tuple[str, int], TokenBucket] = TTLCache(
+            tracked, max_age
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"<OutboundBudget: allowed={sum(self.allowed.values())} "
+            f"dropped={sum(self.dropped.values())}>"
+        )
+
+    def allow(self, feature: str, channel_id: int) -> bool:
+        """
+        Spends a token of the feature in the channel
+
+        Parameters
+        ----------
+        feature : str
+            The feature responding, a key of `budgets`
+        channel_id : int
+            The channel the response goes to
+
+        Returns
+        -------
+        bool
+            Whether the response may be sent
+        """
+        now = time.monotonic()
+        key = (feature, channel_id)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(*self.budgets[feature])
+        self._buckets[key] = bucket
+
+        bucket.refill(now)
+        self.shared.refill(now)
+        if bucket.tokens < 1 or self.shared.tokens < 1:
+            self.dropped[feature] += 1
+            return False
+        bucket.tokens -= 1
+        self.shared.tokens -= 1
+        self.allowed[feature] += 1
+        return True
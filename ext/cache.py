@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Generic, Iterator, MutableMapping, Optional, Tuple, TypeVar
+
+
+__all__ = ("TTLCache",)
+
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class TTLCache(MutableMapping[K, V], Generic[K, V]):
+    """
+    Mapping that keeps at most ``max_size`` entries, each for at most
+    ``max_age`` seconds. The least recently used entry is dropped first,
+    and expired entries are dropped one at a time as they are reached.
+
+    Attributes
+    ----------
+    max_size : int
+        The number of entries kept
+    max_age : Optional[float]
+        The seconds an entry is kept after it was set, ``None`` for no limit
+    """
+
+    def __init__(self, max_size: int, max_age: Optional[float] = None) -> None:
+        self.max_size = max_size
+        self.max_age = max_age
+        self._data: OrderedDict[K, Tuple[float, V]] = OrderedDict()
+
+    def __repr__(self) -> str:
+        return f"<TTLCache: size={len(self)} max_size={self.max_size}>"
+
+    def _expired(self, expires: float) -> bool:
+        return self.max_age is not None and expires < time.monotonic()
+
+    def __getitem__(self, key: K) -> V:
+        expires, value = self._data[key]
+        if self._expired(expires):
+            del self._data[key]
+            raise KeyError(key)
+        self._data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: K, value: V) -> None:
+        expires = time.monotonic() + self.max_age if self.max_age is not None else 0
+        self._data[key] = (expires, value)
+        self._data.move_to_end(key)
+        self.prune()
+
+    def __delitem__(self, key: K) -> None:
+        del self._data[key]
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[K]:
+        self.prune(full=True)
+        return iter(list(self._data))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def prune(self, *, full: bool = False) -> None:
+        """
+        Drops entries over the size limit and expired entries at the
+        least recently used end, or every expired entry when ``full``
+        """
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+        if self.max_age is None:
+            return
+        if full:
+            for key, (expires, _) in list(self._data.items()):
+                if self._expired(expires):
+                    del self._data[key]
+            return
+        while self._data:
+            key, (expires, _) = next(iter(self._data.items()))
+            if not self._expired(expires):
+                break
+            del self._data[key]
@@ -19,6 +19,45 @@ __all__ = (
     "THANK_INFO_CONFIG_SCHEMA",
     "THANK_DATA_CONFIG_SCHEMA",
     "MESSAGE_METRIC_SCHEMA",
+    "SCHEMA_VERSION_SCHEMA",
+    "METRIC_FLUSH_INTERVAL",
+    "METRIC_FLUSH_ROWS",
+    "WARNING_EXPIRY",
+    "INVITE_CACHE_SIZE",
+    "INVITE_CACHE_TTL",
+    "INVITE_NEGATIVE_TTL",
+    "INVITE_RESOLVE_CONCURRENCY",
+    "MESSAGE_CACHE_SIZE",
+    "MESSAGE_CACHE_MAX_AGE",
+    "FLOOD_MAX_MESSAGES",
+    "FLOOD_MAX_DUPLICATES",
+    "FLOOD_WINDOW",
+    "FLOOD_TRACKED_SIZE",
+    "FLOOD_TIMEOUT",
+    "OUTBOUND_BUDGETS",
+    "OUTBOUND_GLOBAL_BUDGET",
+    "OUTBOUND_TRACKED_SIZE",
+    "HTTP_POOL_SIZE",
+    "HTTP_POOL_SIZE_PER_HOST",
+    "HTTP_DNS_CACHE_TTL",
+    "HTTP_KEEPALIVE_TIMEOUT",
+    "HTTP_TIMEOUT",
+    "HTTP_CONNECT_TIMEOUT",
+    "HTTP_CACHE_MAX_BYTES",
+    "PREFETCH_BUFFER_SIZE",
+    "HTTP_BREAKER_THRESHOLD",
+    "HTTP_BREAKER_RESET",
+    "HTTP_RETRY_ATTEMPTS",
+    "HTTP_RETRY_RATIO",
+    "HTTP_RETRY_RESERVE",
+    "HTTP_RETRY_BACKOFF",
+    "HTTP_RETRY_MAX_BACKOFF",
+    "SQLITE_WRITER_PRAGMAS",
+    "SQLITE_READER_PRAGMAS",
+    "SQLITE_READER_POOL_SIZE",
+    "STATEMENT_CACHE_SIZE",
+    "SLOW_QUERY_THRESHOLD",
+    "QUERY_LATENCY_BUCKETS",
     "TCR_STAFF_ROLE_ID",
     "MODMAIL_CHANNEL_ID",
     "MODMAIL_WEBHOOK_URL",
@@ -133,6 +172,85 @@ MESSAGE_METRIC_SCHEMA = """CREATE TABLE IF NOT EXISTS message_metric (
                         );"""
 
 
+SCHEMA_VERSION_SCHEMA = """CREATE TABLE IF NOT EXISTS schema_version (
+                            version INTEGER PRIMARY KEY,
+                            description TEXT,
+                            applied_at BIGINT
+                        );"""
+
+
+# Connection tuning, see ext.engine
+SQLITE_WRITER_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA mmap_size = 67108864",  # 64 MiB
+    "PRAGMA cache_size = -16000",  # ~16 MB
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+SQLITE_READER_PRAGMAS = (
+    "PRAGMA query_only = ON",
+    "PRAGMA mmap_size = 67108864",
+    "PRAGMA cache_size = -8000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+SQLITE_READER_POOL_SIZE = 2  # read-only connections per database
+STATEMENT_CACHE_SIZE = 256  # compiled statement shapes kept per CRUD helper
+
+# Query instrumentation, see ext.instrumentation
+SLOW_QUERY_THRESHOLD = float(os.getenv("SLOW_QUERY_THRESHOLD", 0.1))  # seconds
+QUERY_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)  # seconds
+
+# Write-behind settings for message_metric, see ext.aggregator
+METRIC_FLUSH_INTERVAL = 30  # seconds between flushes
+METRIC_FLUSH_ROWS = 500  # pending (user, guild) rows that force an early flush
+
+WARNING_EXPIRY = 60 * 60 * 24 * 31  # seconds before a warning is removed
+
+# Invite code resolution, see ext.invites
+INVITE_CACHE_SIZE = 2048  # codes kept before the least recently used is dropped
+INVITE_CACHE_TTL = 60 * 60 * 6  # seconds a resolved code is trusted
+INVITE_NEGATIVE_TTL = 60 * 60  # seconds an unknown code is remembered as invalid
+INVITE_RESOLVE_CONCURRENCY = 4  # invite lookups in flight at once
+
+# Command responses kept so an edited command edits its response
+MESSAGE_CACHE_SIZE = 500
+MESSAGE_CACHE_MAX_AGE = 60 * 15  # seconds
+
+# Flood detection in front of the message handlers, see ext.flood
+FLOOD_MAX_MESSAGES = int(os.getenv("FLOOD_MAX_MESSAGES", 6))  # per window
+FLOOD_MAX_DUPLICATES = int(os.getenv("FLOOD_MAX_DUPLICATES", 4))  # per window
+FLOOD_WINDOW = float(os.getenv("FLOOD_WINDOW", 5))  # seconds
+FLOOD_TRACKED_SIZE = 4096  # member and channel pairs tracked at once
+FLOOD_TIMEOUT = int(os.getenv("FLOOD_TIMEOUT", 60 * 10))  # seconds
+
+# Automatic reactions and replies, see ext.budget
+OUTBOUND_BUDGETS = {  # feature: (responses per channel, seconds to refill)
+    "cat_reaction": (3, 30.0),
+    "repo_mention": (3, 30.0),
+}
+OUTBOUND_GLOBAL_BUDGET = (10, 10.0)  # shared by every feature and channel
+OUTBOUND_TRACKED_SIZE = 1024  # feature and channel pairs tracked at once
+
+# The shared HTTP client, see ext.http
+HTTP_POOL_SIZE = 100  # open connections across every host
+HTTP_POOL_SIZE_PER_HOST = 10  # open connections to a single host
+HTTP_DNS_CACHE_TTL = 60 * 5  # seconds a resolved host is reused
+HTTP_KEEPALIVE_TIMEOUT = 30  # seconds an idle connection is kept open
+HTTP_TIMEOUT = 15  # seconds a whole request may take
+HTTP_CONNECT_TIMEOUT = 5  # seconds to get a pooled or new connection
+HTTP_CACHE_MAX_BYTES = 4 * 1024 * 1024  # cached response bodies, see Http.get
+PREFETCH_BUFFER_SIZE = 5  # ready payloads kept per prefetched endpoint
+HTTP_BREAKER_THRESHOLD = 5  # failures in a row that open a host's breaker
+HTTP_BREAKER_RESET = 30  # seconds an open breaker waits before a probe
+HTTP_RETRY_ATTEMPTS = 2  # retries of a failed idempotent request
+HTTP_RETRY_RATIO = 0.2  # retries allowed per request sent, across every host
+HTTP_RETRY_RESERVE = 10  # retries that can be saved up while hosts are healthy
+HTTP_RETRY_BACKOFF = 0.2  # seconds before the first retry, doubled every retry
+HTTP_RETRY_MAX_BACKOFF = 2  # seconds, upper bound of the backoff
+
+
 TICKETS_CONFIG_SCHEMA = """
             CREATE TABLE IF NOT EXISTS tickets (
                 message_id BIGINT PRIMARY KEY,
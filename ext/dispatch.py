@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import discord
+
+from .consts import TCR_STAFF_ROLE_ID
+from .flood import FloodDetector
+from .helpers import find_invite_codes
+from .instrumentation import LatencyHistogram
+
+if TYPE_CHECKING:
+    from discord.ext import commands
+
+    from .models import CodingBot
+
+
+__all__ = ("MessageView", "MessageHandler", "MessageDispatcher", "message_handler")
+
+
+Prefilter = Callable[["MessageView"], bool]
+Callback = Callable[["MessageView"], Awaitable[Any]]
+
+
+class MessageView:
+    """
+    A message together with the values its handlers derive from it,
+    each computed once on first access and shared by every handler
+
+    Attributes
+    ----------
+    bot : CodingBot
+        The bot that received the message
+    message : discord.Message
+        The message itself
+    flood : Optional[str]
+        Why the message tripped the flood detector, ``None`` if it did not
+    """
+
+    def __init__(self, bot: CodingBot, message: discord.Message) -> None:
+        self.bot = bot
+        self.message = message
+        self.flood: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return f"<MessageView: id={self.message.id}>"
+
+    @property
+    def author(self) -> discord.abc.User:
+        return self.message.author
+
+    @property
+    def guild(self) -> Optional[discord.Guild]:
+        return self.message.guild
+
+    @property
+    def channel(self) -> discord.abc.MessageableChannel:
+        return self.message.channel
+
+    @property
+    def content(self) -> str:
+        return self.message.content
+
+    @functools.cached_property
+    def lowered(self) -> str:
+        return self.message.content.lower()
+
+    @functools.cached_property
+    def tokens(self) -> FrozenSet[str]:
+        """
+        The whitespace separated words of the lowered content
+        """
+        return frozenset(self.lowered.split())
+
+    @functools.cached_property
+    def invite_codes(self) -> Tuple[str, ...]:
+        return find_invite_codes(self.message.content)
+
+    @functools.cached_property
+    def is_command(self) -> bool:
+        return self.message.content.startswith(tuple(self.bot.command_prefix))
+
+    @functools.cached_property
+    def is_staff(self) -> bool:
+        if not isinstance(self.author, discord.Member):
+            return False
+        return self.author.get_role(TCR_STAFF_ROLE_ID) is not None
+
+    @functools.cached_property
+    def can_manage_guild(self) -> bool:
+        if not isinstance(self.author, discord.Member):
+            return False
+        return self.channel.permissions_for(self.author).manage_guild
+
+
+class MessageHandler:
+    """
+    A callback of the dispatcher with the checks that decide whether it runs
+
+    Attributes
+    ----------
+    name : str
+        The unique name of the handler, e.g. ``"ListenerCog.repo_mention"``
+    callback : Callback
+        The coroutine function called with the `MessageView`
+    when : Optional[Prefilter]
+        A cheap synchronous check, the handler is skipped when it is falsy
+    guild_only : bool
+        Whether direct messages are skipped
+    ignore_bots : bool
+        Whether messages of bots are skipped
+    owner : Any
+        The object that registered the handler, usually a cog
+    latency : LatencyHistogram
+        The run time of the callback
+    errors : int
+        The number of runs that raised
+    """
+
+    __slots__ = (
+        "name",
+        "callback",
+        "when",
+        "guild_only",
+        "ignore_bots",
+        "owner",
+        "latency",
+        "errors",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        callback: Callback,
+        *,
+        when: Optional[Prefilter] = None,
+        guild_only: bool = True,
+        ignore_bots: bool = True,
+        owner: Any = None,
+    ) -> None:
+        self.name = name
+        self.callback = callback
+        self.when = when
+        self.guild_only = guild_only
+        self.ignore_bots = ignore_bots
+        self.owner = owner
+        self.latency = LatencyHistogram()
+        self.errors = 0
+
+    def __repr__(self) -> str:
+        return f"<MessageHandler: {self.name}>"
+
+    def matches(self, view: MessageView) -> bool:
+        message = view.message
+        if self.ignore_bots and message.author.bot:
+            return False
+        if self.guild_only and message.guild is None:
+            return False
+        return self.when is None or bool(self.when(view))
+
+
+def message_handler(
+    *,
+    when: Optional[Callable[[Any, MessageView], bool]] = None,
+    guild_only: bool = True,
+    ignore_bots: bool = True,
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """
+    Marks a cog method as a message handler, registered with
+    `MessageDispatcher.add_cog`
+
+    Parameters
+    ----------
+    when : Optional[Callable[[Any, MessageView], bool]]
+        The prefilter, called with the cog and the view
+    guild_only : bool
+        Whether direct messages are skipped
+    ignore_bots : bool
+        Whether messages of bots are skipped
+    """
+
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        func.__message_handler__ = (when, guild_only, ignore_bots)
+        return func
+
+    return decorator
+
+
+class MessageDispatcher:
+    """
+    Sends every message through a single listener.
+
+    The `MessageView` is built once per message and passed to every
+    handler whose prefilter matches. Matching handlers run as separate
+    tasks, like regular listeners, so a slow handler does not delay
+    the others.
+
+    Messages that trip the flood detector skip every handler and are
+    reported with the ``message_flood`` event instead.
+
+    Attributes
+    ----------
+    bot : CodingBot
+        The bot the dispatcher belongs to
+    handlers : Dict[str, MessageHandler]
+        The registered handlers, in registration order
+    flood : FloodDetector
+        The detector every guild message goes through first
+    """
+
+    def __init__(self, bot: CodingBot) -> None:
+        self.bot = bot
+        self.handlers: Dict[str, MessageHandler] = {}
+        self.flood = FloodDetector()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self.handlers)
+
+    def register(self, handler: MessageHandler) -> None:
+        if handler.name in self.handlers:
+            raise ValueError(f"Message handler {handler.name} is already registered")
+        self.handlers[handler.name] = handler
+
+    def unregister(self, name: str) -> Optional[MessageHandler]:
+        return self.handlers.pop(name, None)
+
+    def add_cog(self, cog: commands.Cog) -> List[MessageHandler]:
+        """
+        Registers every method of the cog marked with `message_handler`
+
+        Parameters
+        ----------
+        cog : commands.Cog
+            The cog to register, usually from its ``cog_load``
+
+        Returns
+        -------
+        List[MessageHandler]
+            The registered handlers
+        """
+        marked = {}
+        for base in reversed(type(cog).__mro__):
+            for attribute, func in base.__dict__.items():
+                if hasattr(func, "__message_handler__"):
+                    marked[attribute] = func.__message_handler__
+
+        added = []
+        for attribute, (when, guild_only, ignore_bots) in marked.items():
+            handler = MessageHandler(
+                f"{cog.qualified_name}.{attribute}",
+                getattr(cog, attribute),
+                when=functools.partial(when, cog) if when else None,
+                guild_only=guild_only,
+                ignore_bots=ignore_bots,
+                owner=cog,
+            )
+            self.register(handler)
+            added.append(handler)
+        return added
+
+    def remove_cog(self, cog: commands.Cog) -> None:
+        for name, handler in tuple(self.handlers.items()):
+            if handler.owner is cog:
+                del self.handlers[name]
+
+    async def dispatch(self, message: discord.Message) -> MessageView:
+        """
+        Starts every handler matching the message
+
+        Parameters
+        ----------
+        message : discord.Message
+            The received message
+
+        Returns
+        -------
+        MessageView
+            The view passed to the handlers
+        """
+        view = MessageView(self.bot, message)
+        view.flood = self._check_flood(view)
+        if view.flood is not None:
+            self.bot.dispatch("message_flood", message, view.flood)
+            return view
+        for handler in self.handlers.values():
+            try:
+                matched = handler.matches(view)
+            except Exception:
+                handler.errors += 1
+                await self.bot.on_error(handler.name, message)
+                continue
+            if matched:
+                self._schedule(self._run(handler, view))
+        return view
+
+    def _check_flood(self, view: MessageView) -> Optional[str]:
+        message = view.message
+        if message.guild is None or message.author.bot or view.is_staff:
+            return None
+        return self.flood.hit(
+            message.channel.id, message.author.id, view.lowered.strip()
+        )
+
+    def _schedule(self, coro: Awaitable[Any]) -> None:
+        # Keep a reference so running handlers are not garbage collected
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, handler: MessageHandler, view: MessageView) -> None:
+        started = time.perf_counter()
+        try:
+            await handler.callback(view)
+        except Exception:
+            handler.errors += 1
+            await self.bot.on_error(handler.name, view.message)
+        finally:
+            handler.latency.observe(time.perf_counter() - started)
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from typing import AsyncIterator, Iterable, List, Optional
+
+import aiosqlite
+
+from .consts import (
+    SQLITE_READER_POOL_SIZE,
+    SQLITE_READER_PRAGMAS,
+    SQLITE_WRITER_PRAGMAS,
+)
+
+
+__all__ = ("Engine",)
+
+
+class Engine:
+    """
+    Connection manager for a single SQLite database file.
+
+    Every database gets one writer connection running in WAL mode and a
+    small pool of read-only connections, so long reads never queue behind
+    writes on the writer's worker thread.
+
+    Attributes
+    ----------
+    name : str
+        The name of the database, e.g. ``"thanks"``
+    path : str
+        The path of the database file
+    pool_size : int
+        The number of read-only connections to keep open
+    writer : Optional[aiosqlite.Connection]
+        The connection used for every write
+    write_lock : asyncio.Lock
+        Serialises writes so a transaction never picks up another task's
+        statements or has them commit it halfway
+    """
+
+    def __init__(
+        self, name: str, path: str, *, pool_size: int = SQLITE_READER_POOL_SIZE
+    ) -> None:
+        self.name = name
+        self.path = path
+        self.pool_size = pool_size
+        self.writer: Optional[aiosqlite.Connection] = None
+        self.write_lock = asyncio.Lock()
+        # The task running `transaction`, tasks it spawns do not join it
+        self._owner: Optional[asyncio.Task] = None
+        self._readers: List[aiosqlite.Connection] = []
+        self._idle: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+
+    def __repr__(self) -> str:
+        return f"<Engine: {self.name} readers={self.pool_size}>"
+
+    @staticmethod
+    async def _apply(conn: aiosqlite.Connection, pragmas: Iterable[str]) -> None:
+        for pragma in pragmas:
+            await conn.execute(pragma)
+
+    async def connect(self) -> aiosqlite.Connection:
+        """
+        Opens and tunes the writer connection
+
+        Returns
+        -------
+        aiosqlite.Connection
+            The writer connection
+        """
+        self.writer = await aiosqlite.connect(self.path)
+        await self._apply(self.writer, SQLITE_WRITER_PRAGMAS)
+        return self.writer
+
+    async def open_readers(self) -> None:
+        """
+        Opens the read-only pool, should be called once the schema exists
+        """
+        for _ in range(self.pool_size):
+            conn = await aiosqlite.connect(self.path)
+            await self._apply(conn, SQLITE_READER_PRAGMAS)
+            self._readers.append(conn)
+            self._idle.put_nowait(conn)
+
+    @property
+    def in_transaction(self) -> bool:
+        """
+        Whether the current task is inside `transaction` on this database
+        """
+        return self._owner is not None and self._owner is asyncio.current_task()
+
+    @contextlib.asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        Borrows a read-only connection, falling back to the writer
+        when no pool was opened or inside a transaction,
+        so the transaction can read its own writes
+        """
+        if not self._readers or self.in_transaction:
+            yield self.writer
+            return
+        conn = await self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put_nowait(conn)
+
+    @contextlib.asynccontextmanager
+    async def write(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        Holds the writer for a single write, unless the current task
+        already owns it through `transaction`
+        """
+        if self.in_transaction:
+            yield self.writer
+            return
+        async with self.write_lock:
+            yield self.writer
+
+    @contextlib.asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        Groups every write of the current task into one atomic commit,
+        rolling back if the block raises. Nested transactions join the
+        outer one.
+        """
+        if self.in_transaction:
+            yield self.writer
+            return
+        async with self.write_lock:
+            self._owner = asyncio.current_task()
+            try:
+                await self.writer.execute("BEGIN IMMEDIATE")
+                try:
+                    yield self.writer
+                except BaseException:
+                    await self.writer.rollback()
+                    raise
+                await self.writer.commit()
+            finally:
+                self._owner = None
+
+    async def close(self) -> None:
+        for conn in self._readers:
+            await conn.close()
+        self._readers.clear()
+        if self.writer is not None:
+            await self.writer.close()
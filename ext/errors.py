@@ -13,3 +13,21 @@ class InsufficientPrivilegeError(commands.CheckFailure):
 
     def __str__(self) -> str:
         return self.message
+
+
+class CircuitOpenError(Exception):
+    """
+    Exception for requests to an upstream host whose circuit breaker is open
+
+    Attributes
+    ----------
+    host : str
+        The host that is failing
+    retry_after : float
+        The seconds until the host is tried again
+    """
+
+    def __init__(self, host: str, retry_after: float) -> None:
+        self.host = host
+        self.retry_after = retry_after
+        super().__init__(f"{host} is unavailable, retrying in {retry_after:.1f}s")
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import time
+from collections import Counter, deque
+from typing import Deque, Optional, Tuple
+
+from .cache import TTLCache
+from .consts import (
+    FLOOD_MAX_DUPLICATES,
+    FLOOD_MAX_MESSAGES,
+    FLOOD_TRACKED_SIZE,
+    FLOOD_WINDOW,
+)
+
+
+__all__ = ("FloodDetector",)
+
+
+class _Window:
+    """
+    The recent messages of one member in one channel
+    """
+
+    __slots__ = ("entries", "hashes")
+
+    def __init__(self) -> None:
+        # (timestamp, content hash), oldest first
+        self.entries: Deque[Tuple[float, Optional[int]]] = deque()
+        self.hashes: Counter[Optional[int]] = Counter()
+
+    def popleft(self) -> None:
+        _, digest = self.entries.popleft()
+        self.hashes[digest] -= 1
+        if not self.hashes[digest]:
+            del self.hashes[digest]
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hashes.clear()
+
+
+class FloodDetector:
+    """
+    Detects members flooding a channel, either with many messages
+    or with the same message over and over.
+
+    Every member and channel pair keeps a bounded window of message
+    timestamps and content hashes. A message only appends to its window
+    and drops the entries that fell out of it, so a check takes constant
+    time no matter how busy the channel is.
+
+    Attributes
+    ----------
+    max_messages : int
+        The messages allowed within ``per`` seconds
+    max_duplicates : int
+        The identical messages allowed within ``per`` seconds
+    per : float
+        The length of the window in seconds
+    trips : int
+        The number of floods detected
+    """
+
+    def __init__(
+        self,
+        *,
+        max_messages: int = FLOOD_MAX_MESSAGES,
+        max_duplicates: int = FLOOD_MAX_DUPLICATES,
+        per: float = FLOOD_WINDOW,
+        tracked: int = FLOOD_TRACKED_SIZE,
+    ) -> None:
+        self.max_messages = max_messages
+        self.max_duplicates = max_duplicates
+        self.per = per
+        self.trips = 0
+        self._size = max(max_messages, max_duplicates)
+        # Windows of members that stopped posting expire on their own
+        self._windows: TTLCache[Tuple[int, int], _Window] = TTLCache(tracked, per)
+
+    def __repr__(self) -> str:
+        return (
+            f"<FloodDetector: {self.max_messages}/{self.per:g}s "
+            f"tracked={len(self._windows)} trips={self.trips}>"
+        )
+
+    def hit(
+        self,
+        channel_id: int,
+        user_id: int,
+        content: str,
+        *,
+        now: Optional[float] = None,
+    ) -> Optional[str]:
+        """
+        Records a message and checks whether it trips the detector.
+        The window is cleared when it does, so a flood trips only once.
+
+        Parameters
+        ----------
+        channel_id : int
+            The channel the message was sent in
+        user_id : int
+            The author of the message
+        content : str
+            The normalised content, empty messages are never duplicates
+        now : Optional[float]
+            The monotonic time of the message, defaults to now
+
+        Returns
+        -------
+        Optional[str]
+            Why the detector tripped, ``None`` if it did not
+        """
+        if now is None:
+            now = time.monotonic()
+        key = (channel_id, user_id)
+        window = self._windows.get(key)
+        if window is None:
+            window = _Window()
+        # Setting it again refreshes its expiry
+        self._windows[key] = window
+
+        entries = window.entries
+        while entries and entries[0][0] <= now - self.per:
+            window.popleft()
+        if len(entries) == self._size:
+            window.popleft()
+        digest = hash(content) if content else None
+        entries.append((now, digest))
+        window.hashes[digest] += 1
+
+        if len(entries) >= self.max_messages:
+            reason = f"sent {len(entries)} messages in {self.per:g} seconds"
+        elif digest is not None and window.hashes[digest] >= self.max_duplicates:
+            reason = (
+                f"sent the same message {window.hashes[digest]} times "
+                f"in {self.per:g} seconds"
+            )
+        else:
+            return None
+        window.clear()
+        self.trips += 1
+        return reason
+
+    def forget(self, channel_id: int, user_id: int) -> None:
+        self._windows.pop((channel_id, user_id), None)
@@ -10,8 +10,7 @@ import string
 import sys
 import traceback
 from io import BytesIO
-from typing import TYPE_CHECKING, Any, Callable, List, Optional, Tuple
-from lrclib import LrcLibAPI
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
 import aiohttp
 import discord
 import humanize
@@ -26,14 +25,20 @@ from github import Github
 import os
 
 if TYPE_CHECKING:
+    from ext.http import Http
     from ext.models import CodingBot
     from discord.ext import commands
 
 
-async def check_invite(bot, content, channel):
-    # content = discord.utils.remove_markdown(content)
+# The one invite pattern of the bot, the domain is matched case-insensitively
+# but codes are case-sensitive
+INVITE_REGEX = re.compile(
+    r"(?i:(?:https?://)?(?:www\.)?discord(?:(?:app)?\.com/invite|\.gg))"
+    r"/([a-zA-Z0-9\-]{2,})"
+)
 
-    whitelisted = [
+INVITE_WHITELIST = frozenset(
+    {
         681882711945641997,  # TCA
         336642139381301249,  # Discord.py
         222078108977594368,  # Discord.js
@@ -42,31 +47,40 @@ async def check_invite(bot, content, channel):
         412754940885467146,  # Blurple
         613425648685547541,  # Discord Developers
         661257119588417627,  # World of Coding
-    ]
-    pattern = r"discord(?:(?:(?:app)?\.com)\/invite|\.gg)/([a-zA-z0-9\-]{2,})\b"
-    matches = re.findall(pattern, content, re.MULTILINE)
-    if channel.id in [
+    }
+)
+
+INVITE_ALLOWED_CHANNELS = frozenset(
+    {
         754992725480439809,  # self-advertising
         727029474767667322,  # partnerships
-    ]:
+    }
+)
+
+
+def find_invite_codes(content: str) -> Tuple[str, ...]:
+    """
+    Returns the invite codes of a message, without duplicates and in order
+    """
+    return tuple(dict.fromkeys(INVITE_REGEX.findall(content)))
+
+
+async def check_invite(bot, content, channel, codes=None):
+    # content = discord.utils.remove_markdown(content)
+
+    if channel.id in INVITE_ALLOWED_CHANNELS:
         return False
-    if len(matches) > 5:  # why 5?
+    if codes is None:
+        codes = find_invite_codes(content)
+    if len(codes) > 5:  # why 5?
         return True
-    for code in matches:
-        try:
-            invite = await bot.fetch_invite(code)
-        except discord.errors.NotFound:
-            invite = None
-        if invite and invite.guild.id not in whitelisted:
-            return True
-    return False
+    foreign = await bot.invite_cache.find_foreign(bot, codes, INVITE_WHITELIST)
+    return foreign is not None
 
 
-async def find_anime_source(session, source_image: str):
+async def find_anime_source(http: Http, source_image: str):
     base = "https://api.trace.moe/search?anilistInfo&url={}"
-    async with session.get(base.format(source_image)) as resp:
-        data = await resp.json()
-    return data
+    return await http.get(base.format(source_image), _json=True)
 
 
 def grouper(n, iterable):
@@ -307,36 +321,8 @@ class UrbanDefinition:
 class UrbanDictionary:
     BASE_URL = "https://www.urbandictionary.com"
 
-    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
-        self.session = session
-
-    def require_session(coro: Callable) -> None:
-        """
-        Outer decorator for methods that require a session.
-
-        Parameters
-        ----------
-        coro : `Callable`
-            The coroutine to be wrapped.
-
-        Returns
-        -------
-        `Callable`
-            The wrapped coroutine.
-        """
-
-        async def wrapper(self, *args):
-            if self.session is None or self.session.closed:
-                self.session = aiohttp.ClientSession()
-            return await coro(self, *args)
-
-        return wrapper
-
-    async def __aenter__(self) -> "UrbanDictionary":
-        return self
-
-    async def __aexit__(self, *exc) -> None:
-        await self.session.close()
+    def __init__(self, http: Http):
+        self.http = http
 
     def get_example(self, soup: BeautifulSoup, references: list) -> str:
         """
@@ -446,7 +432,6 @@ class UrbanDictionary:
             )
         ]
 
-    @require_session
     async def define(self, word: str, results: int = 1) -> List[UrbanDefinition]:
         """
         Get the definition of a word from urban dictionary.
@@ -469,11 +454,13 @@ class UrbanDictionary:
             If the word is not found.
         """
         real_link = f"{self.BASE_URL}/define.php?term={word}"
-        async with self.session.get(real_link) as resp:
-            if resp.status != 200:
-                raise Exception("Failed to get definition")
-            else:
-                text = await resp.text()
+        try:
+            # Definitions rarely change, repeated lookups revalidate instead
+            text = await self.http.get(
+                real_link, ttl=60 * 60, raise_for_status=True
+            )
+        except aiohttp.ClientResponseError:
+            raise Exception("Failed to get definition")
         return await self.parse(text, results)
 
 
@@ -604,8 +591,7 @@ class Spotify:
         pog = act.album_cover_url
         name = "".join([x for x in act.title if x in s])
         name = name[0:21] + "..." if len(name) > 21 else name
-        rad = await bot.session.get(pog)
-        pic = BytesIO(await rad.read())
+        pic = BytesIO(await bot.http_client.read(pog, coalesce=True))
         return await self.pil_process(pic, name, artists, time, time_at, track)
 
     async def get_embed(self) -> Tuple[discord.Embed, discord.File, discord.ui.View]:
@@ -811,24 +797,36 @@ def upload(file_path: str, member_name: str, file_name: str):
 
 
 
-def get_lyrics(name: str, artist: str) -> str:
+async def get_lyrics(
+    http: Http, name: str, artist: str
+) -> Optional[Tuple[str, int]]:
+    """
+    Searches lrclib for the lyrics of a song
+
+    Returns
+    -------
+    Optional[Tuple[str, int]]
+        The lyrics and 1 when they are synced, 0 when they are plain
+    """
     user_agent = (
         "Mozilla/5.0 (X11; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0"
     )
-
-    # Prepare the API
-    api = LrcLibAPI(user_agent=user_agent)
-    id = api.search_lyrics(track_name=name, artist_name=artist)
-
-    # Check if lyrics are available
-    if len(id) != 0:
-        lyrics = api.get_lyrics_by_id(id[0].id)
-        s_lyrics = lyrics.synced_lyrics, 1
-        if not s_lyrics:
-            s_lyrics = lyrics.plain_lyrics, 0
-        return s_lyrics
-    else:
+    # Search results already carry the lyrics, no second request is needed
+    results = await http.get(
+        "https://lrclib.net/api/search",
+        _json=True,
+        ttl=60 * 60,
+        params={"track_name": name, "artist_name": artist},
+        headers={"User-Agent": user_agent},
+    )
+    if not isinstance(results, list) or not results:
         return None
+    lyrics = results[0]
+    if lyrics.get("syncedLyrics"):
+        return lyrics["syncedLyrics"], 1
+    if lyrics.get("plainLyrics"):
+        return lyrics["plainLyrics"], 0
+    return None
 
 
 def parse_timestamp_to_seconds(timestamp):
@@ -857,20 +855,100 @@ def find_surrounding_lyrics(lyrics, target_seconds):
 
 
 
-def filter_banned_words(text: str):
-    with open("storage/banned_word.txt") as f:
-        words = f.read().split(", ")
-    
-    new_text = text
+def _half_censor(match: re.Match) -> str:
+    matched_word = match.group()
+    word_length = len(matched_word) // 2
+    stars = r"\*" * word_length
+    return f"{stars}{matched_word[word_length:]}"
+
+
+def _word_trie_pattern(words: Iterable[str]) -> str:
+    # One branch per shared prefix, so the regex engine never retries a
+    # prefix for every word that starts with it. Longer words win since
+    # the optional tail is tried greedily.
+    trie: Dict[str, dict] = {}
     for word in words:
-        pattern = re.compile(re.escape(word), re.IGNORECASE)
-        
-        def censor(match):
-            matched_word = match.group()
-            word_length = len(matched_word) // 2
-            stars = "\*" * word_length
-            return f"{stars}{matched_word[word_length:]}"
-        
-        new_text = pattern.sub(censor, new_text)
-
-    return new_text
\ No newline at end of file
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [
+            re.escape(char) + build(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class BannedWordMatcher:
+    """
+    Censors banned words in a single pass over the text.
+
+    The words are compiled into one prefix-tree regex and matched against
+    the lowered text, the longest word wins so that e.g. ``cocksucker`` is
+    censored rather than ``cock``. The pattern is rebuilt only when the
+    word file's modification time changes.
+
+    Attributes
+    ----------
+    path : str
+        The comma separated word list
+    """
+
+    def __init__(self, path: str = "storage/banned_word.txt") -> None:
+        self.path = path
+        self._mtime: Optional[int] = None
+        self._pattern: Optional[re.Pattern] = None
+        self._fallback: Optional[re.Pattern] = None
+
+    def __repr__(self) -> str:
+        return f"<BannedWordMatcher: {self.path}>"
+
+    @property
+    def pattern(self) -> Optional[re.Pattern]:
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self._mtime:
+            with open(self.path) as f:
+                words = {word.strip().lower() for word in f.read().split(",")}
+            words.discard("")
+            source = _word_trie_pattern(words)
+            self._pattern = re.compile(source) if words else None
+            self._fallback = re.compile(source, re.IGNORECASE) if words else None
+            self._mtime = mtime
+        return self._pattern
+
+    def censor(self, text: str) -> str:
+        pattern = self.pattern
+        if pattern is None:
+            return text
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Some characters lower to several, the spans would not line up
+            return self._fallback.sub(_half_censor, text)
+
+        parts = []
+        last = 0
+        for match in pattern.finditer(lowered):
+            start, end = match.span()
+            word = text[start:end]
+            half = len(word) // 2
+            parts.extend((text[last:start], r"\*" * half, word[half:]))
+            last = end
+        if not parts:
+            return text
+        parts.append(text[last:])
+        return "".join(parts)
+
+
+banned_words = BannedWordMatcher()
+
+
+def filter_banned_words(text: str):
+    return banned_words.censor(text)
\ No newline at end of file
@@ -1,11 +1,481 @@
+import asyncio
+import functools
+import json
+import random
+import time
+from collections import OrderedDict, deque
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    Mapping,
+    Optional,
+    TypeVar,
+)
+
 import aiohttp
-from discord.ext import tasks
+import yarl
+
+from .consts import (
+    HTTP_BREAKER_RESET,
+    HTTP_BREAKER_THRESHOLD,
+    HTTP_CACHE_MAX_BYTES,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_POOL_SIZE,
+    HTTP_POOL_SIZE_PER_HOST,
+    HTTP_RETRY_ATTEMPTS,
+    HTTP_RETRY_BACKOFF,
+    HTTP_RETRY_MAX_BACKOFF,
+    HTTP_RETRY_RATIO,
+    HTTP_RETRY_RESERVE,
+    HTTP_TIMEOUT,
+    PREFETCH_BUFFER_SIZE,
+)
+from .errors import CircuitOpenError
+
+
+T = TypeVar("T")
+
+
+def create_session() -> aiohttp.ClientSession:
+    """
+    Creates the session shared by the whole bot, with pooled keep-alive
+    connections, cached DNS lookups and a timeout on every request
+    """
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_SIZE,
+        limit_per_host=HTTP_POOL_SIZE_PER_HOST,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+    )
+    timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+class Payload:
+    """
+    A response read in full, safe to share between callers
+    """
+
+    __slots__ = ("status", "headers", "body", "encoding")
+
+    def __init__(
+        self,
+        status: int,
+        headers: Mapping[str, str],
+        body: bytes,
+        encoding: str,
+    ) -> None:
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.encoding = encoding
+
+    def decode(self, _json: bool = False):
+        # Decoded for every caller so none of them share a mutable result
+        text = self.body.decode(self.encoding)
+        if not _json:
+            return text
+        return json.loads(text) if text.strip() else None
+
+
+class CachedResponse:
+    __slots__ = ("payload", "expires")
+
+    def __init__(self, payload: Payload, expires: float) -> None:
+        self.payload = payload
+        self.expires = expires
+
+
+class SingleFlight:
+    """
+    Runs a single call per key at a time, callers that arrive while
+    it is in flight wait for its result instead of starting their own
+
+    Attributes
+    ----------
+    calls : int
+        The calls that were started
+    shared : int
+        The calls saved by waiting for one already in flight
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.shared = 0
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def __repr__(self) -> str:
+        return f"<SingleFlight: calls={self.calls} shared={self.shared}>"
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Awaits the call in flight for ``key``, or starts ``func`` when none is
+
+        Parameters
+        ----------
+        key : Hashable
+            Identifies calls that have the same result
+        func : Callable[[], Awaitable[T]]
+            Starts the call
+
+        Returns
+        -------
+        T
+            The result of the call, shared by every caller
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            self.calls += 1
+            flight = self._flights[key] = asyncio.ensure_future(func())
+            flight.add_done_callback(functools.partial(self._land, key))
+        else:
+            self.shared += 1
+        # A cancelled caller must not cancel the call for the others
+        return await asyncio.shield(flight)
+
+    def _land(self, key: Hashable, flight: asyncio.Future) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            # Marks the exception retrieved even when every caller left
+            flight.exception()
+
+
+class ResponseCache:
+    """
+    Response bodies of GET requests, capped by their total size.
+    The least recently used body is dropped first.
+
+    Attributes
+    ----------
+    max_bytes : int
+        The total size of the bodies kept
+    size : int
+        The total size of the bodies currently kept
+    hits : int
+        The requests answered without a request
+    revalidated : int
+        The requests answered by a ``304 Not Modified``
+    misses : int
+        The requests that downloaded the body
+    """
+
+    def __init__(self, max_bytes: int = HTTP_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return (
+            f"<ResponseCache: size={len(self)} bytes={self.size} "
+            f"hit_ratio={self.hit_ratio:.2f}>"
+        )
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        The share of requests that did not download the body
+        """
+        total = self.hits + self.revalidated + self.misses
+        return (self.hits + self.revalidated) / total if total else 0.0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: CachedResponse) -> None:
+        self.discard(key)
+        if len(entry.payload.body) > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self.size += len(entry.payload.body)
+        while self.size > self.max_bytes:
+            _, dropped = self._entries.popitem(last=False)
+            self.size -= len(dropped.payload.body)
+
+    def discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry.payload.body)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+
+# Methods that are safe to send again after a failure
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE"})
+
+
+def is_upstream_failure(status: int) -> bool:
+    """
+    Whether a response status means the host is failing, rather than the request
+    """
+    return status >= 500 or status == 429
+
+
+class CircuitBreaker:
+    """
+    Stops requests to a host after it failed several times in a row.
+
+    An open breaker rejects requests with `CircuitOpenError` until
+    ``reset_after`` seconds have passed. It then lets a single probe
+    through (half-open), which closes it on success and opens it
+    again on failure.
+
+    Attributes
+    ----------
+    host : str
+        The host the breaker guards
+    state : str
+        ``"closed"``, ``"open"`` or ``"half-open"``
+    failures : int
+        The failures since the last success
+    trips : int
+        The number of times the breaker opened
+    rejected : int
+        The requests rejected without being sent
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        host: str,
+        *,
+        threshold: int = HTTP_BREAKER_THRESHOLD,
+        reset_after: float = HTTP_BREAKER_RESET,
+    ) -> None:
+        self.host = host
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.rejected = 0
+        self.opened_at = 0.0
+
+    def __repr__(self) -> str:
+        return f"<CircuitBreaker: {self.host} {self.state} failures={self.failures}>"
+
+    @property
+    def retry_after(self) -> float:
+        """
+        The seconds until the next probe, 0 unless the breaker is open
+        """
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_after - time.monotonic())
+
+    def before(self) -> None:
+        """
+        Called before every request, turns the first request after
+        the reset timeout into the probe
+
+        Raises
+        ------
+        CircuitOpenError
+            The breaker is open, or half-open with the probe in flight
+        """
+        if self.state == self.CLOSED:
+            return
+        if self.state == self.OPEN and not self.retry_after:
+            self.state = self.HALF_OPEN
+            return
+        self.rejected += 1
+        raise CircuitOpenError(self.host, self.retry_after)
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def record_cancel(self) -> None:
+        # A cancelled probe says nothing about the host, allow another one
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic() - self.reset_after
+
+
+class RetryBudget:
+    """
+    Limits retries to a share of the requests sent to every host,
+    so retries cannot multiply the load on a host that is struggling
+
+    Attributes
+    ----------
+    ratio : float
+        The retries earned by every request
+    reserve : float
+        The most retries that can be saved up
+    tokens : float
+        The retries currently available
+    retries : int
+        The retries made
+    denied : int
+        The retries refused because the budget was spent
+    """
+
+    def __init__(
+        self, ratio: float = HTTP_RETRY_RATIO, reserve: float = HTTP_RETRY_RESERVE
+    ) -> None:
+        self.ratio = ratio
+        self.reserve = reserve
+        self.tokens = reserve
+        self.retries = 0
+        self.denied = 0
+
+    def __repr__(self) -> str:
+        return f"<RetryBudget: {self.tokens:.1f}/{self.reserve:g} retries>"
+
+    def deposit(self) -> None:
+        self.tokens = min(self.reserve, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            self.denied += 1
+            return False
+        self.tokens -= 1
+        self.retries += 1
+        return True
+
+
+def backoff(retry: int) -> float:
+    """
+    The seconds to wait before a retry, with full jitter so that
+    requests that failed together do not retry together
+    """
+    return random.uniform(
+        0, min(HTTP_RETRY_MAX_BACKOFF, HTTP_RETRY_BACKOFF * 2 ** (retry - 1))
+    )
+
+
+class Prefetcher:
+    """
+    Keeps a few payloads of an endpoint that returns something random
+    on every call ready, so commands do not wait on the upstream API.
+
+    Every payload is handed out once. Taking one starts a background
+    refill, and an empty buffer falls back to a live request.
+    Payloads that fail ``validate``, such as the JSON body of an error
+    response, are never buffered or handed out.
+
+    Attributes
+    ----------
+    fetch : Callable[[], Awaitable[Any]]
+        Requests a single payload
+    validate : Optional[Callable[[Any], bool]]
+        Whether a payload is usable, every payload is when ``None``
+    buffer : Deque[Any]
+        The payloads ready to be handed out, oldest first
+    served : int
+        The payloads handed out from the buffer
+    live : int
+        The payloads fetched while the caller waited
+    failures : int
+        The background requests that raised or returned an unusable payload
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[Any]],
+        size: int = PREFETCH_BUFFER_SIZE,
+        *,
+        validate: Optional[Callable[[Any], bool]] = None,
+    ) -> None:
+        self.fetch = fetch
+        self.validate = validate
+        self.buffer: Deque[Any] = deque(maxlen=size)
+        self.served = 0
+        self.live = 0
+        self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def __repr__(self) -> str:
+        return (
+            f"<Prefetcher: ready={len(self.buffer)}/{self.buffer.maxlen} "
+            f"served={self.served} live={self.live}>"
+        )
+
+    async def get(self) -> Any:
+        """
+        Returns a ready payload, or fetches one when none is ready
+        """
+        try:
+            payload = self.buffer.popleft()
+        except IndexError:
+            pass
+        else:
+            self.served += 1
+            self.refill()
+            return payload
+        self.live += 1
+        try:
+            return await self._fetch()
+        finally:
+            self.refill()
+
+    async def _fetch(self) -> Any:
+        payload = await self.fetch()
+        if self.validate is not None and not self.validate(payload):
+            raise ValueError(f"Unusable payload: {str(payload)[:200]}")
+        return payload
+
+    def refill(self) -> None:
+        """
+        Fills the buffer in the background, unless that is already happening
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._fill())
+
+    async def _fill(self) -> None:
+        while len(self.buffer) < self.buffer.maxlen:
+            try:
+                payload = await self._fetch()
+            except Exception:
+                # Tried again on the next get, the caller falls back to live
+                self.failures += 1
+                return
+            self.buffer.append(payload)
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
 
 
 class Http:
     def __init__(self, session: aiohttp.ClientSession):
         self.session = session
-        self.cache = {"piston": {}}
+        self.cache = ResponseCache()
+        self.flights = SingleFlight()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.retry_budget = RetryBudget()
         self.api = {
             # //////////////////////////////////////////////////////////////////////////
             # prelude
@@ -37,7 +507,7 @@ class Http:
             # },
             "piston": {
                 "runtimes": lambda: self.get(
-                    "https://emkc.org/api/v2/piston/runtimes", _json=True
+                    "https://emkc.org/api/v2/piston/runtimes", _json=True, ttl=60 * 60
                 ),
                 # "execute": "https://emkc.org/api/v2/piston/execute",
                 "execute": lambda language, code: self.post(
@@ -84,14 +554,36 @@ class Http:
                 "api": lambda: self.get("https://api.thecatapi.com/v1/images/search", _json = True)
             }
         }
+        # Random payloads buffered ahead of the commands that use them
+        self.prefetch: Dict[str, Prefetcher] = {
+            "meme": Prefetcher(
+                self.api["get"]["meme"],
+                validate=lambda meme: isinstance(meme, dict)
+                and {"url", "title", "author", "subreddit"} <= meme.keys(),
+            ),
+            "joke": Prefetcher(
+                self.api["joke"]["api"],
+                validate=lambda joke: isinstance(joke, dict)
+                and not joke.get("error")
+                and {"category", "type"} <= joke.keys(),
+            ),
+            # Posted once a day, a single spare is enough
+            "cat": Prefetcher(
+                self.api["cat-api"]["api"],
+                size=1,
+                validate=lambda cats: isinstance(cats, list)
+                and bool(cats)
+                and "url" in cats[0],
+            ),
+        }
 
-        # self.update_data.start()
+    def start_prefetch(self) -> None:
+        for prefetcher in self.prefetch.values():
+            prefetcher.refill()
 
-    @tasks.loop(minutes=5)
-    async def update_data(self):
-        self.cache["piston"]["runtimes"] = await self.get(
-            "https://emkc.org/api/v2/piston/runtimes", _json=True
-        )
+    def close(self) -> None:
+        for prefetcher in self.prefetch.values():
+            prefetcher.close()
 
     # #/////////////////////////////////////////////////////////////////////////
     # # some-random-api
@@ -168,20 +660,119 @@ class Http:
     # http
     # /////////////////////////////////////////////////////////////////////////
 
-    async def get(self, _url, _json=False, **kwargs):
-        async with self.session.get(_url, **kwargs) as response:
-            return await (
-                response.json(content_type=None) if _json else response.text()
-            )
+    def breaker(self, host: str) -> CircuitBreaker:
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = self.breakers[host] = CircuitBreaker(host)
+        return breaker
+
+    async def _send(self, method, _url, **kwargs):
+        breaker = self.breaker(yarl.URL(_url).host or "")
+        self.retry_budget.deposit()
+        retry = 0
+        while True:
+            breaker.before()
+            error = None
+            try:
+                async with self.session.request(method, _url, **kwargs) as response:
+                    payload = Payload(
+                        response.status,
+                        response.headers,
+                        await response.read(),
+                        response.charset or "utf-8",
+                    )
+            except aiohttp.ClientResponseError as exc:
+                # Raised for any error status when raise_for_status is passed
+                error, failed = exc, is_upstream_failure(exc.status)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                error, failed = exc, True
+            except asyncio.CancelledError:
+                breaker.record_cancel()
+                raise
+            else:
+                failed = is_upstream_failure(payload.status)
+
+            if not failed:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+                if (
+                    method in IDEMPOTENT_METHODS
+                    and retry < HTTP_RETRY_ATTEMPTS
+                    and breaker.state == breaker.CLOSED
+                    and self.retry_budget.withdraw()
+                ):
+                    retry += 1
+                    await asyncio.sleep(backoff(retry))
+                    continue
+            if error is not None:
+                raise error
+            return payload
+
+    async def request(self, method, _url, *, coalesce=False, **kwargs):
+        """
+        Sends a request and reads the whole body. With ``coalesce``,
+        identical requests made while it is in flight share it instead
+        of being sent again.
+
+        Only coalesce requests whose response depends on the URL and body
+        alone, never ones that return something random on every call.
+        """
+        if not coalesce:
+            return await self._send(method, _url, **kwargs)
+        key = (method, _url, repr(sorted(kwargs.items())))
+        return await self.flights.do(key, lambda: self._send(method, _url, **kwargs))
+
+    async def get(self, _url, _json=False, *, ttl=None, coalesce=False, **kwargs):
+        """
+        Fetches a URL, caching the response for ``ttl`` seconds when given.
+        An expired response is revalidated with its ``ETag`` and
+        ``Last-Modified`` headers instead of downloaded again.
+
+        Only pass ``ttl`` for endpoints whose response depends on the URL
+        alone, never for ones that return something random on every call.
+        Cached lookups are always coalesced.
+        """
+        if ttl is None:
+            payload = await self.request("GET", _url, coalesce=coalesce, **kwargs)
+            return payload.decode(_json)
+
+        params = kwargs.get("params")
+        key = str(yarl.URL(_url).update_query(params)) if params else _url
+        entry = self.cache.get(key)
+        now = time.monotonic()
+        if entry is not None and entry.expires > now:
+            self.cache.hits += 1
+            return entry.payload.decode(_json)
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry is not None:
+            if etag := entry.payload.headers.get("ETag"):
+                headers["If-None-Match"] = etag
+            if last_modified := entry.payload.headers.get("Last-Modified"):
+                headers["If-Modified-Since"] = last_modified
+        payload = await self.request(
+            "GET", _url, coalesce=True, headers=headers, **kwargs
+        )
+        if payload.status == 304 and entry is not None:
+            self.cache.revalidated += 1
+            entry.expires = now + ttl
+            return entry.payload.decode(_json)
+        self.cache.misses += 1
+        if payload.status == 200:
+            self.cache.set(key, CachedResponse(payload, now + ttl))
+        else:
+            self.cache.discard(key)
+        return payload.decode(_json)
+
+    async def read(self, _url, *, coalesce=False, **kwargs):
+        return (await self.request("GET", _url, coalesce=coalesce, **kwargs)).body
 
     async def post(self, _url, _json=False, **kwargs):
-        async with self.session.post(_url, **kwargs) as response:
-            return await (response.json() if _json else response.text())
+        return (await self.request("POST", _url, **kwargs)).decode(_json)
 
     async def put(self, _url, _json=False, **kwargs):
-        async with self.session.put(_url, **kwargs) as response:
-            return await (response.json() if _json else response.text())
+        return (await self.request("PUT", _url, **kwargs)).decode(_json)
 
     async def delete(self, _url, _json=False, **kwargs):
-        async with self.session.delete(_url, **kwargs) as response:
-            return await (response.json() if _json else response.text())
+        return (await self.request("DELETE", _url, **kwargs)).decode(_json)
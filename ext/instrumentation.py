@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import bisect
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import aiosqlite
+
+from .consts import QUERY_LATENCY_BUCKETS, SLOW_QUERY_THRESHOLD
+
+
+__all__ = ("LatencyHistogram", "StatementStats", "QueryMonitor")
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram
+
+    Attributes
+    ----------
+    bounds : Tuple[float, ...]
+        The upper bound of every bucket in seconds, a final bucket
+        catches everything above the last bound
+    counts : List[int]
+        The number of samples per bucket
+    count : int
+        The number of samples
+    total : float
+        The sum of all samples in seconds
+    maximum : float
+        The largest sample in seconds
+    """
+
+    __slots__ = ("bounds", "counts", "count", "total", "maximum")
+
+    def __init__(self, bounds: Iterable[float] = QUERY_LATENCY_BUCKETS) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, elapsed: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, elapsed)] += 1
+        self.count += 1
+        self.total += elapsed
+        self.maximum = max(self.maximum, elapsed)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def format(self) -> str:
+        """
+        Renders the non-empty buckets, e.g. ``<=1ms:12 <=5ms:3 >1000ms:1``
+        """
+        labels = [f"<={bound * 1000:g}ms" for bound in self.bounds]
+        labels.append(f">{self.bounds[-1] * 1000:g}ms")
+        return " ".join(
+            f"{label}:{count}" for label, count in zip(labels, self.counts) if count
+        )
+
+
+class StatementStats:
+    """
+    Counters for a single statement shape
+
+    Attributes
+    ----------
+    connection : str
+        The name of the database the statement runs on
+    sql : str
+        The compiled statement
+    latency : LatencyHistogram
+        The execution time, excluding the wait for a connection
+    rows : int
+        The rows returned or changed over all calls
+    """
+
+    __slots__ = ("connection", "sql", "latency", "rows")
+
+    def __init__(self, connection: str, sql: str) -> None:
+        self.connection = connection
+        self.sql = sql
+        self.latency = LatencyHistogram()
+        self.rows = 0
+
+
+class QueryMonitor:
+    """
+    Collects per-statement latency and per-connection queue wait
+    for the `Database` helpers, and logs slow statements together
+    with their query plan.
+
+    Attributes
+    ----------
+    logger : logging.Logger
+        The logger slow statements are reported to
+    threshold : float
+        The execution time in seconds above which a statement is logged
+    statements : Dict[Tuple[str, str], StatementStats]
+        The statement counters, keyed by (connection, sql)
+    waits : Dict[str, LatencyHistogram]
+        The time spent waiting for a connection, keyed by database name
+    """
+
+    def __init__(
+        self, logger: logging.Logger, *, threshold: float = SLOW_QUERY_THRESHOLD
+    ) -> None:
+        self.logger = logger
+        self.threshold = threshold
+        self.statements: Dict[Tuple[str, str], StatementStats] = {}
+        self.waits: Dict[str, LatencyHistogram] = {}
+
+    def record_wait(self, connection: str, waited: float) -> None:
+        if (histogram := self.waits.get(connection)) is None:
+            histogram = self.waits[connection] = LatencyHistogram()
+        histogram.observe(waited)
+
+    async def observe(
+        self,
+        connection: str,
+        conn: aiosqlite.Connection,
+        sql: str,
+        values: Any,
+        started: float,
+        rows: int,
+    ) -> None:
+        """
+        Records one execution, should be called while ``conn`` is still held
+
+        Parameters
+        ----------
+        connection : str
+            The name of the database
+        conn : aiosqlite.Connection
+            The connection the statement ran on, used for the query plan
+        sql : str
+            The compiled statement
+        values : Any
+            The parameters the statement ran with
+        started : float
+            The ``time.perf_counter`` value taken before executing
+        rows : int
+            The rows returned or changed
+        """
+        elapsed = time.perf_counter() - started
+        self.add(connection, sql, elapsed, rows)
+        if elapsed >= self.threshold:
+            plan = await self.explain(conn, sql, values)
+            self.logger.warning(
+                f"Slow query on {connection} took {elapsed * 1000:.1f}ms "
+                f"({rows} rows): {sql}\n{plan}"
+            )
+
+    def add(self, connection: str, sql: str, elapsed: float, rows: int) -> None:
+        key = (connection, sql)
+        if (stats := self.statements.get(key)) is None:
+            stats = self.statements[key] = StatementStats(connection, sql)
+        stats.latency.observe(elapsed)
+        stats.rows += max(rows, 0)
+
+    @staticmethod
+    async def explain(conn: aiosqlite.Connection, sql: str, values: Any) -> str:
+        try:
+            async with conn.execute(f"EXPLAIN QUERY PLAN {sql}", values) as cursor:
+                plan = await cursor.fetchall()
+        except Exception as error:
+            return f"No query plan: {error}"
+        return "\n".join(f"  {row[-1]}" for row in plan)
+
+    def top(self, limit: Optional[int] = 10) -> List[StatementStats]:
+        """
+        Returns the statements that took the most time in total
+
+        Parameters
+        ----------
+        limit : Optional[int]
+            The number of statements to return, ``None`` for all
+
+        Returns
+        -------
+        List[StatementStats]
+            The statements, slowest first
+        """
+        ranked = sorted(
+            self.statements.values(),
+            key=lambda stats: stats.latency.total,
+            reverse=True,
+        )
+        return ranked[:limit]
+
+    def reset(self) -> None:
+        self.statements.clear()
+        self.waits.clear()
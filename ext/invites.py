@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, AbstractSet, Iterable, Optional, Sequence, Tuple
+
+import discord
+
+from .consts import (
+    INVITE_CACHE_SIZE,
+    INVITE_CACHE_TTL,
+    INVITE_NEGATIVE_TTL,
+    INVITE_RESOLVE_CONCURRENCY,
+)
+
+if TYPE_CHECKING:
+    from .models import CodingBot
+
+
+__all__ = ("InviteCache",)
+
+
+# Distinguishes "not cached" from a cached invalid code, which is None
+_MISSING = object()
+
+
+class InviteCache:
+    """
+    Bounded TTL cache of invite code to guild id.
+
+    Codes that do not resolve are cached as ``None`` for a shorter time,
+    so known-bad invites are not fetched again on every post.
+    The cache is warmed from the invites of the bot's own guilds.
+
+    Attributes
+    ----------
+    ttl : float
+        The seconds a resolved code is kept
+    negative_ttl : float
+        The seconds an invalid code is kept
+    max_size : int
+        The number of codes kept before the least recently used is dropped
+    hits : int
+        The lookups answered from the cache
+    misses : int
+        The lookups that needed a request
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float = INVITE_CACHE_TTL,
+        negative_ttl: float = INVITE_NEGATIVE_TTL,
+        max_size: int = INVITE_CACHE_SIZE,
+        concurrency: int = INVITE_RESOLVE_CONCURRENCY,
+    ) -> None:
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        # Shared by every message so a burst of invites stays within limits
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._entries: OrderedDict[str, Tuple[float, Optional[int]]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"<InviteCache: size={len(self)} hits={self.hits} misses={self.misses}>"
+
+    def get(self, code: str, default: object = _MISSING) -> object:
+        """
+        Looks a code up without making a request
+
+        Parameters
+        ----------
+        code : str
+            The invite code
+        default : object
+            Returned when the code is not cached or expired
+
+        Returns
+        -------
+        object
+            The guild id, ``None`` for an invalid code, or ``default``
+        """
+        entry = self._entries.get(code)
+        if entry is None:
+            return default
+        expires, guild_id = entry
+        if expires < time.monotonic():
+            del self._entries[code]
+            return default
+        self._entries.move_to_end(code)
+        return guild_id
+
+    def set(self, code: str, guild_id: Optional[int]) -> None:
+        ttl = self.ttl if guild_id is not None else self.negative_ttl
+        self._entries[code] = (time.monotonic() + ttl, guild_id)
+        self._entries.move_to_end(code)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def discard(self, code: str) -> None:
+        self._entries.pop(code, None)
+
+    def warm(self, guild_id: int, codes: Iterable[str]) -> None:
+        for code in codes:
+            self.set(code, guild_id)
+
+    def warm_guild(self, guild: discord.Guild, invites: Iterable[discord.Invite]):
+        """
+        Caches the vanity code and the given invites of a guild
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The guild the invites belong to
+        invites : Iterable[discord.Invite]
+            The invites of the guild
+        """
+        if guild.vanity_url_code:
+            self.set(guild.vanity_url_code, guild.id)
+        self.warm(guild.id, (invite.code for invite in invites))
+
+    async def resolve(self, bot: CodingBot, code: str) -> Optional[int]:
+        """
+        Returns the guild id an invite code points to,
+        fetching it only when it is not cached
+
+        Parameters
+        ----------
+        bot : CodingBot
+            The bot used to fetch the invite
+        code : str
+            The invite code
+
+        Returns
+        -------
+        Optional[int]
+            The guild id, ``None`` when the invite does not exist
+        """
+        guild_id = self.get(code)
+        if guild_id is not _MISSING:
+            self.hits += 1
+            return guild_id
+        self.misses += 1
+        async with self._semaphore:
+            try:
+                invite = await bot.fetch_invite(code, with_counts=False)
+            except discord.NotFound:
+                self.set(code, None)
+                return None
+        guild_id = invite.guild.id if invite.guild else None
+        self.set(code, guild_id)
+        return guild_id
+
+    async def find_foreign(
+        self, bot: CodingBot, codes: Sequence[str], allowed: AbstractSet[int]
+    ) -> Optional[str]:
+        """
+        Finds a code that points to a guild outside ``allowed``.
+        Cached codes are checked first, the others are resolved concurrently
+        and the lookups still running are cancelled on the first hit.
+
+        Parameters
+        ----------
+        bot : CodingBot
+            The bot used to fetch invites
+        codes : Sequence[str]
+            The codes to check, without duplicates
+        allowed : AbstractSet[int]
+            The ids of the guilds that may be advertised
+
+        Returns
+        -------
+        Optional[str]
+            The first foreign code found, ``None`` if there is none
+        """
+        unknown = []
+        for code in codes:
+            guild_id = self.get(code)
+            if guild_id is _MISSING:
+                unknown.append(code)
+                continue
+            self.hits += 1
+            if guild_id is not None and guild_id not in allowed:
+                return code
+        if not unknown:
+            return None
+
+        async def lookup(code: str) -> Tuple[str, Optional[int]]:
+            return code, await self.resolve(bot, code)
+
+        tasks = [asyncio.create_task(lookup(code)) for code in unknown]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                code, guild_id = await next_done
+                if guild_id is not None and guild_id not in allowed:
+                    return code
+        finally:
+            for task in tasks:
+                task.cancel()
+        return None
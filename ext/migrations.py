@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, NamedTuple, Sequence, Tuple
+
+from .consts import SCHEMA_VERSION_SCHEMA, TCR_GUILD_ID
+
+if TYPE_CHECKING:
+    from .models import Database
+
+
+__all__ = ("Migration", "MIGRATIONS", "apply_migrations")
+
+
+class Migration(NamedTuple):
+    version: int
+    connection: str
+    description: str
+    statements: Tuple[str, ...]
+
+
+# Append only, never edit a migration that has shipped.
+# Versions are global, each database records the ones it has applied.
+MIGRATIONS: Tuple[Migration, ...] = (
+    Migration(
+        version=1,
+        connection="warnings",
+        description="Index warnings and help warnings by member",
+        statements=(
+            # warnings, clearwarning: WHERE guild_id, user_id ORDER BY date DESC
+            """CREATE INDEX IF NOT EXISTS warnings_member_idx
+               ON warnings (guild_id, user_id, date, moderator_id, reason)""",
+            # helper warnings, helper clearwarning
+            """CREATE INDEX IF NOT EXISTS help_warns_member_idx
+               ON help_warns (guild_id, user_id, date, helper_id, reason)""",
+        ),
+    ),
+    Migration(
+        version=2,
+        connection="thanks",
+        description="Index thanks by thank id, receiver and leaderboard order",
+        statements=(
+            # thank delete: SELECT user_id WHERE thank_id
+            """CREATE INDEX IF NOT EXISTS thanks_data_thank_id_idx
+               ON thanks_data (thank_id, user_id)""",
+            # thank show: WHERE user_id
+            """CREATE INDEX IF NOT EXISTS thanks_data_user_idx
+               ON thanks_data (user_id, date)""",
+            # getusermetric: count(*) WHERE guild_id, user_id, thank_revoked
+            """CREATE INDEX IF NOT EXISTS thanks_data_revoked_idx
+               ON thanks_data (guild_id, user_id, thank_revoked)""",
+            # thank leaderboard: WHERE guild_id ORDER BY thanks_count DESC, user_id
+            """CREATE INDEX IF NOT EXISTS thanks_info_leaderboard_idx
+               ON thanks_info (guild_id, thanks_count DESC, user_id)""",
+        ),
+    ),
+    Migration(
+        version=3,
+        connection="tickets",
+        description="Index tickets by opener and ticket id",
+        statements=(
+            # CloseButton: SELECT ticket_id, message_id, reason WHERE opened_by
+            """CREATE INDEX IF NOT EXISTS tickets_opened_by_idx
+               ON tickets (opened_by, ticket_id, message_id, reason)""",
+            # TrashButton: DELETE WHERE ticket_id
+            """CREATE INDEX IF NOT EXISTS tickets_ticket_id_idx
+               ON tickets (ticket_id)""",
+        ),
+    ),
+    Migration(
+        version=4,
+        connection="warnings",
+        description="Index warnings and help warnings by date for expiry",
+        statements=(
+            # remove_inactive_warns: DELETE WHERE guild_id AND date < ?
+            """CREATE INDEX IF NOT EXISTS warnings_expiry_idx
+               ON warnings (guild_id, date)""",
+            """CREATE INDEX IF NOT EXISTS help_warns_expiry_idx
+               ON help_warns (guild_id, date)""",
+        ),
+    ),
+    Migration(
+        version=5,
+        connection="afk",
+        description="Scope AFK entries to a guild",
+        statements=(
+            "ALTER TABLE afk ADD COLUMN guild_id BIGINT",
+            # The afk command is only usable in TCR, older rows belong to it
+            f"UPDATE afk SET guild_id = {TCR_GUILD_ID} WHERE guild_id IS NULL",
+            # Keep the latest row of members that were set AFK more than once
+            """DELETE FROM afk WHERE rowid NOT IN (
+                   SELECT max(rowid) FROM afk GROUP BY guild_id, user_id
+               )""",
+            """CREATE UNIQUE INDEX IF NOT EXISTS afk_member_idx
+               ON afk (guild_id, user_id)""",
+        ),
+    ),
+    Migration(
+        version=6,
+        connection="tickets",
+        description="Persist open ModMail sessions",
+        statements=(
+            # ModMail: looked up by user and by thread, one ticket per user
+            """CREATE TABLE IF NOT EXISTS modmail_sessions (
+                   user_id BIGINT PRIMARY KEY,
+                   thread_id BIGINT NOT NULL UNIQUE,
+                   opened_at BIGINT
+               )""",
+        ),
+    ),
+)
+
+
+async def apply_migrations(
+    database: Database, migrations: Sequence[Migration] = MIGRATIONS
+) -> int:
+    """
+    Applies every migration a database has not recorded yet, in order.
+    Each migration runs in its own transaction together with its
+    ``schema_version`` row.
+
+    Parameters
+    ----------
+    database : Database
+        The database to migrate
+    migrations : Sequence[Migration]
+        The migrations to apply
+
+    Returns
+    -------
+    int
+        The number of migrations applied
+    """
+    ordered = sorted(migrations, key=lambda migration: migration.version)
+    versions = [migration.version for migration in ordered]
+    if len(set(versions)) != len(versions):
+        raise ValueError("Duplicate migration version")
+
+    applied = 0
+    for name in dict.fromkeys(migration.connection for migration in ordered):
+        conn = database.conn[name]
+        await conn.execute(SCHEMA_VERSION_SCHEMA)
+        await conn.commit()
+        async with conn.execute("SELECT version FROM schema_version") as cursor:
+            done = {row[0] for row in await cursor.fetchall()}
+
+        for migration in ordered:
+            if migration.connection != name or migration.version in done:
+                continue
+            try:
+                await conn.execute("BEGIN")
+                for statement in migration.statements:
+                    await conn.execute(statement)
+                await conn.execute(
+                    "INSERT INTO schema_version (version, description, applied_at) "
+                    "VALUES (?, ?, ?)",
+                    (migration.version, migration.description, int(time.time())),
+                )
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+            applied += 1
+            database.bot.logger.info(
+                f"Applied migration {migration.version} on {name}: "
+                f"{migration.description}"
+            )
+    return applied
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import contextlib
 import datetime as dt
 import logging
 import os
-import string
+import time
 from dataclasses import dataclass, field
 from typing import (
     Any,
+    AsyncContextManager,
+    AsyncIterator,
     Dict,
     Iterable,
     List,
@@ -17,7 +20,6 @@ from typing import (
     Union,
 )
 
-import aiohttp
 import aiosqlite
 import discord
 from discord.ext import commands
@@ -31,6 +33,8 @@ from .consts import (
     HELP_COMMAND,
     HELP_WARNINGS_CONFIG_SCHEMA,
     INTENTS,
+    MESSAGE_CACHE_MAX_AGE,
+    MESSAGE_CACHE_SIZE,
     MESSAGE_METRIC_SCHEMA,
     PREFIX_CONFIG_SCHEMA,
     THANK_DATA_CONFIG_SCHEMA,
@@ -40,33 +44,64 @@ from .consts import (
     VERSION,
     Version,
 )
+from .afk import AfkStore
+from .aggregator import MetricAggregator
+from .budget import OutboundBudget
+from .cache import TTLCache
+from .dispatch import MessageDispatcher
+from .engine import Engine
 from .helpers import AntiRaid, WelcomeBanner, log_error
+from .http import Http, create_session
+from .instrumentation import QueryMonitor
+from .invites import InviteCache
+from .migrations import apply_migrations
+from .statements import (
+    delete_statement,
+    insert_statement,
+    page_statement,
+    record_fields,
+    select_statement,
+    statement_cache_info,
+    update_statement,
+)
 from .logger import create_logger
 
 load_dotenv(".env", verbose=True)
 
 
 class Record:
-    __slots__ = ("arguments",)
+    """
+    A row returned by the Database helpers
+
+    Values are kept in the row tuple and looked up through a column map
+    shared by every row of the same query.
+    Supports attribute, ``record["column"]`` and ``record[index]`` access.
+    """
+
+    __slots__ = ("_fields", "_values")
 
-    def __init__(self, arguments: Dict[str, Any]) -> None:
-        self.arguments = arguments
+    def __init__(self, fields: Dict[str, int], values: Tuple[Any, ...]) -> None:
+        self._fields = fields
+        self._values = values
+
+    @property
+    def arguments(self) -> Dict[str, Any]:
+        return dict(zip(self._fields, self._values))
 
     def __getitem__(self, __item: Union[str, int]) -> Any:
         if isinstance(__item, str):
-            if __item in self.arguments:
-                return self.arguments[__item]
+            if __item in self._fields:
+                return self._values[self._fields[__item]]
             raise AttributeError(f"Dynamic object has no attribute '{__item}'")
-        elif isinstance(__item, int):  # type: ignore
-            return tuple(self.arguments.values())[__item]
+        return self._values[__item]
 
     def __getattr__(self, __item: str):
-        if __item in self.arguments:
-            return self.arguments[__item]
+        if not __item.startswith("_") and __item in self._fields:
+            return self._values[self._fields[__item]]
         raise AttributeError(f"Dynamic object has no attribute '{__item}'")
 
     def __len__(self):
-        return len(self.arguments.keys())
+        return len(self._values)
 
     def __repr__(self) -> str:
         argument = ", ".join(f"{key}={value}" for key, value in self.arguments.items())
@@ -74,18 +109,7 @@ class Record:
 
     @classmethod
     def from_tuple(cls, arguments: Iterable[Any], tuple_: Iterable[Any]) -> Record:
-        arguments = [
-            "".join(
-                map(
-                    lambda x: x
-                    if x in string.ascii_letters + string.digits + "_"
-                    else "",
-                    arg,
-                )
-            )
-            for arg in arguments
-        ]
-        return cls(dict(zip(arguments, tuple_)))
+        return cls(record_fields(tuple(arguments)), tuple(tuple_))
 
 
 @dataclass(slots=True, kw_only=True, repr=True)
@@ -112,15 +136,29 @@ class Database:
     Attributes
     ----------
     conn : Dict[str, aiosqlite.Connection]
-        A dictionary of connections
+        A dictionary of writer connections
+    engines : Dict[str, Engine]
+        A dictionary of engines, each owning a writer and a reader pool
     is_closed : bool
         Whether the connections are closed
+    aggregator : MetricAggregator
+        The write-behind buffer for message metrics
+    monitor : QueryMonitor
+        The latency and slow query statistics of the helpers
+    path : str
+        The directory holding the database files
     """
 
-    def __init__(self, bot: CodingBot):
+    names = ("config", "warnings", "afk", "thanks", "metrics", "tickets")
+
+    def __init__(self, bot: CodingBot, path: str = "./database"):
+        self.path = path
         self.conn: Dict[str, aiosqlite.Connection] = {}
+        self.engines: Dict[str, Engine] = {}
         self.is_closed: bool = False
         self.bot: CodingBot = bot
+        self.aggregator = MetricAggregator(self)
+        self.monitor = QueryMonitor(bot.logger)
 
     def __getattr__(self, __name: str) -> Any:
         if __name in self.conn:
@@ -129,25 +167,16 @@ class Database:
 
     async def __aenter__(self) -> "Database":
         self.bot.logger.info("Making connections to databases")
-        self.conn["config"] = await aiosqlite.connect("./database/config.db")
-        self.conn["warnings"] = await aiosqlite.connect("./database/warnings.db")
-        self.conn["afk"] = await aiosqlite.connect("./database/afk.db")
-        self.conn["thanks"] = await aiosqlite.connect("./database/thanks.db")
-        self.conn["metrics"] = await aiosqlite.connect("./database/metrics.db")
-        self.conn["tickets"] = await aiosqlite.connect("./database/tickets.db")
+        for name in self.names:
+            engine = self.engines[name] = Engine(name, f"{self.path}/{name}.db")
+            self.conn[name] = await engine.connect()
         await self.init_dbs()
+        for engine in self.engines.values():
+            await engine.open_readers()
+        self.aggregator.start()
         self.bot.logger.info("Finished creating all connections")
         return self
 
-    async def fill_cache(self):
-        self.bot.logger.info("Filling stored cache data before startup")
-        record = await self.select_record(
-            "afk", table="afk", arguments=["user_id", "reason", "afk_time"]
-        )
-
-        for row in record:
-            self.bot.afk_cache[row.user_id] = (row.reason, row.afk_time)
-
     async def init_dbs(self):
         async with self.cursor("config") as cursor:
             await cursor.execute(PREFIX_CONFIG_SCHEMA)
@@ -171,8 +200,10 @@ class Database:
             await cursor.execute(TICKETS_CONFIG_SCHEMA)
 
         await self.commit()
+        await apply_migrations(self)
 
     async def __aexit__(self, *args: Any) -> None:
+        await self.aggregator.close()
         await self.commit()
         await self.close()
 
@@ -193,18 +224,127 @@ class Database:
         values: Optional[Tuple[Any, ...]] = None,
         extras: Optional[List[str]] = None,
     ) -> Optional[List[Record]]:
-        statement = f"""SELECT {", ".join(arguments)} FROM {table}"""
-        if where is not None:
-            assign_question = map(lambda x: f"{x} = ?", where)
-            statement += f' WHERE {" AND ".join(assign_question)}'
-        if extras:
-            for stuff in extras:
-                statement += f" {stuff}"
-        async with self.cursor(connection) as cursor:
-            await cursor.execute(statement, values or ())
-            if rows := [i async for i in cursor]:
-                return [Record.from_tuple(arguments, row) for row in rows]
-            return None
+        statement = select_statement(table, arguments, where, extras)
+        async with self._acquire(connection) as conn:
+            started = time.perf_counter()
+            async with conn.execute(statement.sql, values or ()) as cursor:
+                rows = await cursor.fetchall()
+            await self.monitor.observe(
+                connection, conn, statement.sql, values or (), started, len(rows)
+            )
+        if rows:
+            fields = statement.fields
+            return [Record(fields, row) for row in rows]
+        return None
+
+    async def iter_records(
+        self,
+        connection: str,
+        /,
+        *,
+        arguments: Tuple[str, ...],
+        table: str,
+        where: Optional[Tuple[str, ...]] = None,
+        values: Optional[Tuple[Any, ...]] = None,
+        extras: Optional[List[str]] = None,
+        batch_size: int = 100,
+    ) -> AsyncIterator[Record]:
+        """
+        Streams the rows of a select instead of collecting them in a list.
+        Takes the same arguments as `select_record`.
+
+        The reader connection is held until the iterator is exhausted,
+        wrap it in ``contextlib.aclosing`` when breaking out early.
+
+        Yields
+        ------
+        Record
+            The rows, fetched ``batch_size`` at a time
+        """
+        statement = select_statement(table, arguments, where, extras)
+        fields = statement.fields
+        # Only time spent in SQLite is recorded, not the consumer's
+        elapsed, count = 0.0, 0
+        async with self._acquire(connection) as conn:
+            started = time.perf_counter()
+            try:
+                async with conn.execute(statement.sql, values or ()) as cursor:
+                    while rows := await cursor.fetchmany(batch_size):
+                        elapsed += time.perf_counter() - started
+                        count += len(rows)
+                        for row in rows:
+                            yield Record(fields, row)
+                        started = time.perf_counter()
+                elapsed += time.perf_counter() - started
+            finally:
+                self.monitor.add(connection, statement.sql, elapsed, count)
+
+    async def select_page(
+        self,
+        connection: str,
+        /,
+        *,
+        arguments: Tuple[str, ...],
+        table: str,
+        where: Optional[Tuple[str, ...]] = None,
+        values: Optional[Tuple[Any, ...]] = None,
+        order_by: Tuple[str, ...] = ("date", "rowid"),
+        after: Optional[Tuple[Any, ...]] = None,
+        limit: int = 10,
+        descending: bool = True,
+    ) -> Tuple[List[Record], Optional[Tuple[Any, ...]]]:
+        """
+        Fetches one page of rows using keyset pagination
+
+        Parameters
+        ----------
+        connection : str
+            The name of the database
+        arguments : Tuple[str, ...]
+            The columns to select, the ``order_by`` columns are added if missing
+        table : str
+            The table to select from
+        where : Optional[Tuple[str, ...]]
+            The columns to filter on
+        values : Optional[Tuple[Any, ...]]
+            The values for ``where``
+        order_by : Tuple[str, ...]
+            The columns forming the page key, must end with a unique column
+        after : Optional[Tuple[Any, ...]]
+            The key returned with the previous page, ``None`` for the first one
+        limit : int
+            The number of rows per page
+        descending : bool
+            Whether to page from the highest key down
+
+        Returns
+        -------
+        Tuple[List[Record], Optional[Tuple[Any, ...]]]
+            The rows of the page and the key of the next page,
+            ``None`` when this is the last page
+        """
+        statement = page_statement(
+            table,
+            arguments,
+            where,
+            order_by,
+            descending=descending,
+            keyed=after is not None,
+        )
+        parameters = (*(values or ()), *(after or ()), limit + 1)
+        async with self._acquire(connection) as conn:
+            started = time.perf_counter()
+            async with conn.execute(statement.sql, parameters) as cursor:
+                rows = await cursor.fetchall()
+            await self.monitor.observe(
+                connection, conn, statement.sql, parameters, started, len(rows)
+            )
+        fields = statement.fields
+        records = [Record(fields, row) for row in rows[:limit]]
+        if len(rows) <= limit:
+            return records, None
+        last = records[-1]
+        return records, tuple(last[key] for key in order_by)
 
     async def delete_record(
         self,
@@ -214,15 +354,10 @@ class Database:
         table: str,
         where: Tuple[str, ...],
         values: Optional[Tuple[Any, ...]] = None,
-    ) -> None:
-        delete_statement = f"DELETE FROM {table}"
-        if where is not None:
-            assign_question = map(lambda x: f"{x} = ?", where)
-            delete_statement += f' WHERE {" AND ".join(assign_question)}'
-
-        async with self.cursor(connection) as cursor:
-            await cursor.execute(delete_statement, values or ())
-            await getattr(self, connection).commit()
+        commit: bool = True,
+    ) -> int:
+        statement = delete_statement(table, where)
+        return await self._write(connection, statement.sql, values or (), commit)
 
     async def insert_record(
         self,
@@ -233,18 +368,10 @@ class Database:
         values: Tuple[Any, ...],
         columns: Tuple[str, ...],
         extras: Optional[List[str]] = None,
+        commit: bool = True,
     ) -> None:
-        insert_statement = """
-                           INSERT INTO {}({}) VALUES ({})
-                           """.format(
-            table, ", ".join(columns), ", ".join(["?"] * len(columns))
-        )
-        if extras:
-            for stuff in extras:
-                insert_statement += f" {stuff}"
-        async with self.cursor(connection) as cursor:
-            await cursor.execute(insert_statement, values)
-            await getattr(self, connection).commit()
+        statement = insert_statement(table, columns, extras)
+        await self._write(connection, statement.sql, values, commit)
 
     async def update_record(
         self,
@@ -256,33 +383,84 @@ class Database:
         where: Tuple[str, ...],
         values: Tuple[Any, ...],
         extras: Optional[List[str]] = None,
+        commit: bool = True,
     ) -> None:
-        update_statement = """
-                           UPDATE {} SET {} WHERE {}
-                           """.format(
-            table,
-            ", ".join(map(lambda x: f"{x} = ?" if "=" not in x else x, to_update)),
-            " AND ".join(map(lambda x: f"{x} = ?", where)),
-        )
-        if extras:
-            for stuff in extras:
-                update_statement += f" {stuff}"
-        async with self.cursor(connection) as cursor:
-            await cursor.execute(update_statement, values)
-            await getattr(self, connection).commit()
+        statement = update_statement(table, to_update, where, extras)
+        await self._write(connection, statement.sql, values, commit)
+
+    async def _write(
+        self, connection: str, sql: str, values: Tuple[Any, ...], commit: bool
+    ) -> int:
+        engine = self.engines[connection]
+        async with self._acquire(connection, write=True) as conn:
+            started = time.perf_counter()
+            async with conn.execute(sql, values) as cursor:
+                rowcount = cursor.rowcount
+            # Inside a transaction the commit belongs to the transaction
+            if commit and not engine.in_transaction:
+                await conn.commit()
+            await self.monitor.observe(connection, conn, sql, values, started, rowcount)
+        return rowcount
+
+    @contextlib.asynccontextmanager
+    async def _acquire(
+        self, connection: str, *, write: bool = False
+    ) -> AsyncIterator[aiosqlite.Connection]:
+        # Borrows a connection, recording how long the caller queued for it
+        engine = self.engines[connection]
+        requested = time.perf_counter()
+        async with engine.write() if write else engine.reader() as conn:
+            self.monitor.record_wait(connection, time.perf_counter() - requested)
+            yield conn
+
+    def transaction(
+        self, connection: str, /
+    ) -> AsyncContextManager[aiosqlite.Connection]:
+        """
+        Groups the writes made to a database into one atomic commit
+
+        The CRUD helpers called inside the block defer their commit to it,
+        and the block is rolled back as a whole if it raises.
+        Reads inside the block see its uncommitted writes.
+
+        .. code-block:: python
+
+            async with bot.conn.transaction("thanks"):
+                await bot.conn.insert_record("thanks", ...)
+                await bot.conn.update_record("thanks", ...)
+
+        Parameters
+        ----------
+        connection : str
+            The name of the database
+
+        Returns
+        -------
+        AsyncContextManager[aiosqlite.Connection]
+            The context manager, yielding the writer connection
+        """
+        return self.engines[connection].transaction()
+
+    @staticmethod
+    def statement_cache_info() -> Dict[str, Any]:
+        """
+        Returns the hit/miss counters of the compiled statement caches
+        """
+        return statement_cache_info()
 
     @property
     def closed(self):
         return self.is_closed
 
     async def commit(self) -> None:
-        for conn in self.conn.values():
-            await conn.commit()
+        for engine in self.engines.values():
+            async with engine.write() as conn:
+                await conn.commit()
 
     async def close(self) -> None:
         self.is_closed = True
-        for conn in self.conn.values():
-            await conn.close()
+        for engine in self.engines.values():
+            await engine.close()
 
 
 class CodingHelp(commands.HelpCommand):
@@ -368,15 +546,31 @@ class CodingBot(commands.Bot):
             help_command=help_command,
         )
         self.conn: Database = discord.utils.MISSING
+        self.http_client: Http = discord.utils.MISSING
         self.tracker = InviteTracker(self)
+        # The event handlers below drive the tracker, so they warm the invite
+        # cache after its fetch. Its own listeners would fetch a second time
+        for name, listener in (
+            ("on_ready", self.tracker.cache_invites),
+            ("on_invite_create", self.tracker.update_invite_cache),
+            ("on_invite_delete", self.tracker.remove_invite_cache),
+            ("on_guild_join", self.tracker.add_guild_cache),
+            ("on_guild_remove", self.tracker.remove_guild_cache),
+        ):
+            self.remove_listener(listener, name)
+        self.invite_cache = InviteCache()
+        self.budget = OutboundBudget()
         self.welcomer = WelcomeBanner(self)
         self.processing_commands = 0
-        self.message_cache = {}
+        self.message_cache: TTLCache[int, discord.Message] = TTLCache(
+            MESSAGE_CACHE_SIZE, MESSAGE_CACHE_MAX_AGE
+        )
+        self.dispatcher = MessageDispatcher(self)
         self.welcomer_enabled = True
         self.welcomer_channel_id = 743817386792058971
         self.raid_mode_enabled = False
         self.raid_checker = AntiRaid(self)
-        self.afk_cache: Dict[int, Dict[int, Tuple[str, int]]] = {}
+        self.afk = AfkStore(self)
         self.version: Version = VERSION
         self.logger: logging.Logger = create_logger("CodingBot")
         self.owner_ids = [
@@ -402,22 +596,43 @@ class CodingBot(commands.Bot):
 
     async def start(self, token: str, *, reconnect: bool = True) -> None:
         async with Database(self) as self.conn:
-            async with aiohttp.ClientSession() as self.session:
-                return await super().start(token, reconnect=reconnect)
+            self.logger.info(f"Loaded {await self.afk.load()} AFK members")
+            async with create_session() as self.session:
+                self.http_client = Http(self.session)
+                self.http_client.start_prefetch()
+                try:
+                    return await super().start(token, reconnect=reconnect)
+                finally:
+                    self.http_client.close()
 
     async def on_ready(self) -> None:
         await self.wait_until_ready()
-        await self.tracker.cache_invites()
+        for guild in self.guilds:
+            # One guild without Manage Server must not skip the others
+            with contextlib.suppress(discord.HTTPException):
+                await self.tracker.add_guild_cache(guild)
+                self.warm_invite_cache(guild)
         self.logger.info("Coding Bot V6 is ready for action!")
 
+    def warm_invite_cache(self, guild: discord.Guild) -> None:
+        # Reuses the invites the tracker already fetched instead of a request.
+        # InviteTracker._cache is private, see the DiscordUtils pin
+        invites = self.tracker._cache.get(guild.id, {}).values()
+        self.invite_cache.warm_guild(guild, invites)
+
     async def on_invite_create(self, invite: discord.Invite) -> None:
         await self.tracker.update_invite_cache(invite)
+        if invite.guild:
+            self.invite_cache.set(invite.code, invite.guild.id)
 
     async def on_invite_delete(self, invite: discord.Invite) -> None:
         await self.tracker.remove_invite_cache(invite)
+        self.invite_cache.set(invite.code, None)
 
     async def on_guild_join(self, guild: discord.Guild) -> None:
-        await self.tracker.update_guild_cache(guild)
+        with contextlib.suppress(discord.HTTPException):
+            await self.tracker.add_guild_cache(guild)
+            self.warm_invite_cache(guild)
 
     async def on_guild_remove(self, guild: discord.Guild) -> None:
         await self.tracker.remove_guild_cache(guild)
@@ -461,26 +676,32 @@ class CodingBot(commands.Bot):
             embed=embed,
         )
 
+    async def on_message(self, message: discord.Message) -> None:
+        view = await self.dispatcher.dispatch(message)
+        if view.flood is None:
+            await self.process_commands(message)
+
     async def on_error(self, event_method: str, *args: Any, **kwargs: Any):
         await log_error(self, event_method, *args, **kwargs)
 
     async def send(self, ctx, *args, **kwargs) -> discord.Message:
         if getattr(ctx, "msg_before", None) is not None:
-            key = ctx.msg_before.id
-            await self.message_cache[key].edit(*args, **kwargs)
-        else:
-            key = ctx.message.id
-            self.message_cache[key] = await ctx.send(*args, **kwargs)
-        return self.message_cache[key]
+            # The response may have expired while the command ran
+            if response := self.message_cache.get(ctx.msg_before.id):
+                await response.edit(*args, **kwargs)
+                return response
+        key = ctx.message.id
+        response = self.message_cache[key] = await ctx.send(*args, **kwargs)
+        return response
 
     async def reply(self, ctx, *args, **kwargs) -> discord.Message:
         if getattr(ctx, "msg_before", None) is not None:
-            key = ctx.msg_before.id
-            await self.message_cache[key].edit(*args, **kwargs)
-        else:
-            key = ctx.id if isinstance(ctx, discord.Message) else ctx.message.id
-            self.message_cache[key] = await ctx.reply(*args, **kwargs)
-        return self.message_cache[key]
+            if response := self.message_cache.get(ctx.msg_before.id):
+                await response.edit(*args, **kwargs)
+                return response
+        key = ctx.id if isinstance(ctx, discord.Message) else ctx.message.id
+        response = self.message_cache[key] = await ctx.reply(*args, **kwargs)
+        return response
 
     def embed(
         self,
@@ -497,6 +718,11 @@ class CodingBot(commands.Bot):
         return discord.Embed(title=title, description=description, color=color)
 
     async def process_edit(self, msg_before, msg_after):
+        # Embed unfurls and pins also fire edits, and most edits are not commands
+        if msg_before.content == msg_after.content:
+            return
+        if not msg_after.content.startswith(tuple(self.command_prefix)):
+            return
         ctx = await super().get_context(msg_after)
         if msg_before.id in self.message_cache:
             setattr(ctx, "msg_before", msg_before)
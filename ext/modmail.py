@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from .models import CodingBot
+
+
+__all__ = ("ModMailSessions",)
+
+
+class ModMailSessions:
+    """
+    The open ModMail tickets, persisted in the ``modmail_sessions`` table
+    and indexed both ways so a ticket is found from its user or its thread.
+
+    Attributes
+    ----------
+    bot : CodingBot
+        The bot whose database holds the ``modmail_sessions`` table
+    threads : Dict[int, int]
+        The thread id of every user with an open ticket
+    users : Dict[int, int]
+        The user id of every open ticket thread
+    """
+
+    def __init__(self, bot: CodingBot) -> None:
+        self.bot = bot
+        self.threads: Dict[int, int] = {}
+        self.users: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.threads)
+
+    def __repr__(self) -> str:
+        return f"<ModMailSessions: {len(self)} open>"
+
+    async def load(self) -> int:
+        """
+        Loads every open ticket from the database, called when the cog loads
+
+        Returns
+        -------
+        int
+            The number of open tickets
+        """
+        self.threads.clear()
+        self.users.clear()
+        async for record in self.bot.conn.iter_records(
+            "tickets",
+            table="modmail_sessions",
+            arguments=("user_id", "thread_id"),
+        ):
+            self._add(record.user_id, record.thread_id)
+        return len(self)
+
+    def _add(self, user_id: int, thread_id: int) -> None:
+        self._remove(user_id=user_id)
+        self._remove(thread_id=thread_id)
+        self.threads[user_id] = thread_id
+        self.users[thread_id] = user_id
+
+    def _remove(
+        self, *, user_id: Optional[int] = None, thread_id: Optional[int] = None
+    ) -> None:
+        if user_id is not None:
+            thread_id = self.threads.pop(user_id, None)
+            if thread_id is not None:
+                self.users.pop(thread_id, None)
+        elif thread_id is not None:
+            user_id = self.users.pop(thread_id, None)
+            if user_id is not None:
+                self.threads.pop(user_id, None)
+
+    def thread_id(self, user_id: int) -> Optional[int]:
+        return self.threads.get(user_id)
+
+    def user_id(self, thread_id: int) -> Optional[int]:
+        return self.users.get(thread_id)
+
+    def is_thread(self, channel_id: int) -> bool:
+        """
+        Whether the channel is the thread of an open ticket
+        """
+        return channel_id in self.users
+
+    async def open(self, user_id: int, thread_id: int) -> None:
+        await self.bot.conn.insert_record(
+            "tickets",
+            table="modmail_sessions",
+            values=(user_id, thread_id, int(time.time())),
+            columns=["user_id", "thread_id", "opened_at"],
+            extras=[
+                "ON CONFLICT (user_id) DO UPDATE "
+                "SET thread_id = excluded.thread_id, opened_at = excluded.opened_at"
+            ],
+        )
+        self._add(user_id, thread_id)
+
+    async def close(self, thread_id: int) -> Optional[int]:
+        """
+        Forgets the ticket of a thread
+
+        Parameters
+        ----------
+        thread_id : int
+            The thread of the ticket
+
+        Returns
+        -------
+        Optional[int]
+            The user of the ticket, ``None`` if the thread had no ticket
+        """
+        user_id = self.users.get(thread_id)
+        self._remove(thread_id=thread_id)
+        await self.bot.conn.delete_record(
+            "tickets",
+            table="modmail_sessions",
+            where=("thread_id",),
+            values=(thread_id,),
+        )
+        return user_id
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import functools
+import string
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from .consts import STATEMENT_CACHE_SIZE
+
+
+__all__ = (
+    "Statement",
+    "record_fields",
+    "select_statement",
+    "page_statement",
+    "delete_statement",
+    "insert_statement",
+    "update_statement",
+    "statement_cache_info",
+)
+
+
+class Statement(NamedTuple):
+    sql: str
+    fields: Optional[Dict[str, int]] = None
+
+
+Shape = Optional[Tuple[str, ...]]
+
+IDENTIFIER_CHARACTERS = frozenset(string.ascii_letters + string.digits + "_")
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def record_fields(arguments: Tuple[str, ...]) -> Dict[str, int]:
+    """
+    Maps cleaned column names to their position in a row,
+    e.g. ``count(*)`` becomes ``count``
+
+    Parameters
+    ----------
+    arguments : Tuple[str, ...]
+        The selected columns
+
+    Returns
+    -------
+    Dict[str, int]
+        The position of every column, shared by all rows of a query
+    """
+    return {
+        "".join(char for char in argument if char in IDENTIFIER_CHARACTERS): index
+        for index, argument in enumerate(arguments)
+    }
+
+
+def _freeze(items: Optional[Iterable[str]]) -> Shape:
+    # Callers pass lists as often as tuples, the cache needs hashable keys
+    return None if items is None else tuple(items)
+
+
+def _where(where: Tuple[str, ...]) -> str:
+    # Bare column names are equality checks, anything with a placeholder
+    # such as "date < ?" is used as written
+    return " AND ".join(
+        column if "?" in column else f"{column} = ?" for column in where
+    )
+
+
+def _extras(sql: str, extras: Shape) -> str:
+    return " ".join((sql, *extras)) if extras else sql
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _select(table: str, arguments: Tuple[str, ...], where: Shape, extras: Shape):
+    sql = f"SELECT {', '.join(arguments)} FROM {table}"
+    if where is not None:
+        sql += f" WHERE {_where(where)}"
+    return Statement(_extras(sql, extras), record_fields(arguments))
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _page(
+    table: str,
+    arguments: Tuple[str, ...],
+    where: Shape,
+    order_by: Tuple[str, ...],
+    descending: bool,
+    keyed: bool,
+):
+    selected = arguments + tuple(key for key in order_by if key not in arguments)
+    conditions = [_where(where)] if where else []
+    if keyed:
+        keys = ", ".join(order_by)
+        marks = ", ".join(["?"] * len(order_by))
+        conditions.append(f"({keys}) {'<' if descending else '>'} ({marks})")
+    sql = f"SELECT {', '.join(selected)} FROM {table}"
+    if conditions:
+        sql += f" WHERE {' AND '.join(conditions)}"
+    direction = " DESC" if descending else ""
+    sql += f" ORDER BY {', '.join(key + direction for key in order_by)} LIMIT ?"
+    return Statement(sql, record_fields(selected))
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _delete(table: str, where: Shape):
+    sql = f"DELETE FROM {table}"
+    if where is not None:
+        sql += f" WHERE {_where(where)}"
+    return Statement(sql)
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _insert(table: str, columns: Tuple[str, ...], extras: Shape):
+    sql = "INSERT INTO {}({}) VALUES ({})".format(
+        table, ", ".join(columns), ", ".join(["?"] * len(columns))
+    )
+    return Statement(_extras(sql, extras))
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _update(table: str, to_update: Tuple[str, ...], where: Shape, extras: Shape):
+    assignments = ", ".join(
+        f"{column} = ?" if "=" not in column else column for column in to_update
+    )
+    sql = f"UPDATE {table} SET {assignments} WHERE {_where(where)}"
+    return Statement(_extras(sql, extras))
+
+
+def select_statement(
+    table: str,
+    arguments: Iterable[str],
+    where: Optional[Iterable[str]] = None,
+    extras: Optional[Iterable[str]] = None,
+) -> Statement:
+    return _select(table, tuple(arguments), _freeze(where), _freeze(extras))
+
+
+def page_statement(
+    table: str,
+    arguments: Iterable[str],
+    where: Optional[Iterable[str]],
+    order_by: Iterable[str],
+    *,
+    descending: bool,
+    keyed: bool,
+) -> Statement:
+    return _page(
+        table, tuple(arguments), _freeze(where), tuple(order_by), descending, keyed
+    )
+
+
+def delete_statement(table: str, where: Optional[Iterable[str]] = None) -> Statement:
+    return _delete(table, _freeze(where))
+
+
+def insert_statement(
+    table: str, columns: Iterable[str], extras: Optional[Iterable[str]] = None
+) -> Statement:
+    return _insert(table, tuple(columns), _freeze(extras))
+
+
+def update_statement(
+    table: str,
+    to_update: Iterable[str],
+    where: Iterable[str],
+    extras: Optional[Iterable[str]] = None,
+) -> Statement:
+    return _update(table, tuple(to_update), _freeze(where), _freeze(extras))
+
+
+def statement_cache_info() -> Dict[str, functools._CacheInfo]:
+    """
+    Returns the hit/miss counters of every statement cache
+
+    Returns
+    -------
+    Dict[str, functools._CacheInfo]
+        The cache info, keyed by helper name
+    """
+    return {
+        "select": _select.cache_info(),
+        "page": _page.cache_info(),
+        "delete": _delete.cache_info(),
+        "insert": _insert.cache_info(),
+        "update": _update.cache_info(),
+    }
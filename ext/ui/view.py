@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 import time
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, List, Optional, Tuple
 
 import discord
 from discord import ui
 from discord.ext import commands, tasks
 import asyncio
+import contextlib
 from more_itertools import sliced
 from ext.consts import TICKET_REPO, OPEN_TICKET_CATEGORY, CLOSED_TICKET_CATEGORY, TICKET_HANDLER_ROLE_ID, TICKET_LOG_CHANNEL
 from ext.helpers import get_transcript, upload
@@ -15,7 +16,9 @@ from ext.helpers import get_transcript, upload
 if TYPE_CHECKING:
     from typing_extensions import Self
 
-    from ext.models import CodingBot
+    from ext.models import CodingBot, Record
+
+    PageKey = Optional[Tuple[Any, ...]]
 
 
 
@@ -225,6 +228,84 @@ class YesNoView(discord.ui.View):  # class should be moved to a utils class prob
 
 
 
+class KeysetPaginator(ui.View):
+    """
+    Paginator that fetches every page from the database when it is shown,
+    built for `Database.select_page`
+
+    Parameters
+    ----------
+    author : discord.abc.User
+        The only user allowed to use the buttons
+    fetch_page : Callable[[PageKey], Awaitable[Tuple[List[Record], PageKey]]]
+        Fetches the page starting at a key and returns it with the next key
+    build_embed : Callable[[List[Record], int], discord.Embed]
+        Builds the embed for a page and its index
+    first_page : Tuple[List[Record], PageKey]
+        The already fetched first page
+    """
+
+    def __init__(
+        self,
+        author: discord.abc.User,
+        fetch_page: Callable[[PageKey], Awaitable[Tuple[List[Record], PageKey]]],
+        build_embed: Callable[[List[Record], int], discord.Embed],
+        *,
+        first_page: Tuple[List[Record], PageKey],
+        timeout: float = 180,
+    ) -> None:
+        super().__init__(timeout=timeout)
+        self.author = author
+        self.fetch_page = fetch_page
+        self.build_embed = build_embed
+        self.message: Optional[discord.Message] = None
+        self.page = 0
+        self.records, next_key = first_page
+        # keys[i] is the key page i starts after
+        self.keys: List[PageKey] = [None, next_key]
+        self._update_buttons()
+
+    @property
+    def embed(self) -> discord.Embed:
+        return self.build_embed(self.records, self.page)
+
+    def _update_buttons(self) -> None:
+        self._prev.disabled = self.page == 0
+        self._next.disabled = self.keys[self.page + 1] is None
+
+    async def _show(self, interaction: discord.Interaction) -> None:
+        self.records, next_key = await self.fetch_page(self.keys[self.page])
+        del self.keys[self.page + 1 :]
+        self.keys.append(next_key)
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.embed, view=self)
+
+    @ui.button(emoji="◀️", style=discord.ButtonStyle.gray)
+    async def _prev(self, interaction: discord.Interaction, button: ui.Button):
+        self.page -= 1
+        await self._show(interaction)
+
+    @ui.button(emoji="▶️", style=discord.ButtonStyle.gray)
+    async def _next(self, interaction: discord.Interaction, button: ui.Button):
+        self.page += 1
+        await self._show(interaction)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author.id:
+            await interaction.response.send_message(
+                "This is not your button.", ephemeral=True
+            )
+            return False
+        return True
+
+    async def on_timeout(self) -> None:
+        for child in self.children:
+            child.disabled = True
+        if self.message:
+            with contextlib.suppress(discord.HTTPException):
+                await self.message.edit(view=self)
+
+
 # ------------------ TICKET VIEWS ---------------------------
 
 